@@ -1,41 +1,93 @@
 import logging
+import os
+import sys
 
 from sage.all import ZZ
 
+path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
+if sys.path[1] != path:
+    sys.path.insert(1, path)
 
-def factorize(N, coefficient_threshold=32):
+from shared.parallel import parallel_first
+
+
+def _count_nonzero_digits(x, base, digits):
+    nonzero = 0
+    for _ in range(digits):
+        x, digit = divmod(x, base)
+        if digit != 0:
+            nonzero += 1
+
+    return nonzero
+
+
+# Evaluates the irreducible factors (with multiplicity) of the base polynomial, or returns None if it doesn't split.
+def _factor_polynomial(poly, base):
+    factors = [int(f(base)) for f, e in poly.factor() for _ in range(e)]
+    factors = [f for f in factors if f > 1]
+    return tuple(factors) if len(factors) > 1 else None
+
+
+def _factorize_bases(N, coefficient_threshold, start, stop):
+    R = ZZ["x"]
+    for base in range(start, stop):
+        # A random N has about (base - 1) / base nonzero digits, a polynomial with less than coefficient_threshold coefficients has at most coefficient_threshold - 1.
+        # The nonzero digits in a window of least significant digits are a lower bound on the number of coefficients, so the window is chosen such that random N are (almost always) rejected.
+        digits = N.bit_length() // base.bit_length()
+        window = min(digits, 4 * coefficient_threshold)
+        if _count_nonzero_digits(N % base ** window, base, window) >= coefficient_threshold:
+            continue
+
+        logging.debug(f"Trying {base = }...")
+        poly = R(ZZ(N).digits(base))
+        logging.debug(f"Got {len(poly.coefficients())} coefficients")
+        if len(poly.coefficients()) < coefficient_threshold and (factors := _factor_polynomial(poly, base)) is not None:
+            return factors
+
+    return None
+
+
+def factorize(N, coefficient_threshold=32, max_base=None, workers=1, batch_size=4096):
     """
     Recovers the prime factors from a modulus by converting it to different bases.
+    Bases are scanned in batches, which can be split across worker processes, and only bases with few coefficients are factored.
+    By default, small bases are scanned for sparse expansions, and the smallest bases with less than coefficient_threshold digits are scanned for short expansions.
     :param N: the modulus
     :param coefficient_threshold: the threshold of coefficients below which we will try to factor a base k polynomial
-    :return: a tuple containing the prime factors
+    :param max_base: the maximum base to try, all bases up to max_base are scanned (default: bases up to 2^16 and the first 2^12 bases with less than coefficient_threshold digits)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param batch_size: the number of bases in a batch (default: 4096)
+    :return: a tuple containing the prime factors, or None if no factors were found
     """
-    R = ZZ["x"]
-    base = 2
-    while True:
-        logging.debug(f"Trying {base = }...")
-        poly = R(ZZ(N).digits(base))
-        logging.debug(f"Got {len(poly.coefficients())} coefficients")
-        if len(poly.coefficients()) < coefficient_threshold:
-            facs = poly.factor()
-            return tuple(map(lambda f: int(f[0](base)), facs))
+    N = int(N)
+    if max_base is None:
+        # N has less than coefficient_threshold digits in every base >= short_base.
+        short_base = int(ZZ(N).nth_root(coefficient_threshold - 1, truncate_mode=True)[0]) + 1
+        ranges = [(2, min(short_base, 2 ** 16)), (short_base, short_base + 2 ** 12)]
+    else:
+        ranges = [(2, max_base + 1)]
 
-        base += 1
+    # All batches are lazily handled by the same pool of worker processes.
+    args = ((N, coefficient_threshold, start, min(start + batch_size, stop)) for start_, stop in ranges for start in range(start_, stop, batch_size))
+    result = parallel_first(_factorize_bases, args, workers)
+    return None if result is None else result[1]
 
 
 def factorize_base_2x(N):
     """
     Recovers the prime factors from a modulus by converting it to different bases of the form 2^x.
     :param N: the modulus
-    :return: a tuple containing the prime factors
+    :return: a tuple containing the prime factors, or None if no factors were found
     """
     R = ZZ["x"]
     base = 2
-    while True:
+    # If N has less than three digits, the polynomial is linear and can't be factored.
+    while base ** 2 <= N:
         logging.debug(f"Trying {base = }...")
         poly = R(ZZ(N).digits(base))
-        facs = poly.factor()
-        if len(facs) > 1:
-            return tuple(map(lambda f: int(f[0](base)), facs))
+        if (factors := _factor_polynomial(poly, base)) is not None:
+            return factors
 
         base *= 2
+
+    return None
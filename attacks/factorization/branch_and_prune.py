@@ -2,6 +2,8 @@ import logging
 import os
 import sys
 from itertools import product
+from math import log
+from math import sqrt
 
 from sage.all import Zmod
 
@@ -9,8 +11,9 @@ path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
-from shared import bits_to_int_le
 from shared import int_to_bits_le
+from shared.parallel import parallel_map
+from shared.parallel import split_range
 
 
 # Section 3.
@@ -24,27 +27,48 @@ def _tau(x):
 
 
 # Section 2.
-def _find_k(N, e, d_bits):
-    best_match_count = 0
+def _find_k_range(N, e, mask, value, shift, start, stop):
+    best_mismatch_count = None
     best_k = None
-    best_d__bits = None
-    # Enumerate every possible k value.
-    for k in range(1, e):
-        d_ = (k * (N + 1) + 1) // e
-        d__bits = int_to_bits_le(d_, len(d_bits))
-        match_count = 0
-        # Only check the most significant half.
-        for i in range(len(d_bits) // 2 + 2, len(d_bits)):
-            if d_bits[i] == d__bits[i]:
-                match_count += 1
-
-        # Update the best match for d.
-        if match_count > best_match_count:
-            best_match_count = match_count
+    best_d_ = None
+    numerator = start * (N + 1) + 1
+    for k in range(start, stop):
+        d_ = numerator // e
+        # The number of known bits which differ from d_.
+        mismatch_count = bin(((d_ >> shift) ^ value) & mask).count("1")
+        if best_mismatch_count is None or mismatch_count < best_mismatch_count:
+            best_mismatch_count = mismatch_count
             best_k = k
-            best_d__bits = d__bits
+            best_d_ = d_
 
-    return best_k, best_d__bits
+        numerator += N + 1
+
+    return best_mismatch_count, best_k, best_d_
+
+
+# Section 2.
+def _find_k(N, e, d_bits, workers=1):
+    # Only check the most significant half.
+    shift = len(d_bits) // 2 + 2
+    mask = 0
+    value = 0
+    for i in range(shift, len(d_bits)):
+        if d_bits[i] is not None:
+            mask |= 1 << (i - shift)
+            value |= d_bits[i] << (i - shift)
+
+    # Enumerate every possible k value, possibly spread across worker processes.
+    best_mismatch_count = None
+    best_k = None
+    best_d_ = None
+    for mismatch_count, k, d_ in parallel_map(_find_k_range, [(N, e, mask, value, shift, start, stop) for start, stop in split_range(1, e, workers)], workers):
+        # The ranges are ordered, so the smallest k is kept in case of a tie.
+        if mismatch_count is not None and (best_mismatch_count is None or mismatch_count < best_mismatch_count):
+            best_mismatch_count = mismatch_count
+            best_k = k
+            best_d_ = d_
+
+    return best_k, int_to_bits_le(best_d_, len(d_bits))
 
 
 # Section 2.
@@ -64,11 +88,12 @@ def _correct_lsb(e, d_bits, exp):
 
 
 # Branch and prune for the case with p and q bits known.
-def _branch_and_prune_pq(N, p, q, p_, q_, i):
+# r1 = N - p_ * q_ is updated incrementally to avoid recomputing the product at every level.
+def _branch_and_prune_pq(N, p, q, p_, q_, r1, i):
     if i == len(p) or i == len(q):
         yield p_, q_
     else:
-        c1 = ((N - p_ * q_) >> i) & 1
+        c1 = (r1 >> i) & 1
         p_prev = p[i]
         q_prev = q[i]
         p_possible = [0, 1] if p_prev is None else [p_prev]
@@ -78,20 +103,21 @@ def _branch_and_prune_pq(N, p, q, p_, q_, i):
             if p_bit ^ q_bit == c1:
                 p[i] = p_bit
                 q[i] = q_bit
-                yield from _branch_and_prune_pq(N, p, q, p_ | (p_bit << i), q_ | (q_bit << i), i + 1)
+                r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+                yield from _branch_and_prune_pq(N, p, q, p_ | (p_bit << i), q_ | (q_bit << i), r1_, i + 1)
 
         p[i] = p_prev
         q[i] = q_prev
 
 
 # Branch and prune for the case with p, q, and d bits known.
-def _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_, q_, i):
+# r1 = N - p_ * q_ and r2 = k * (N + 1) + 1 - k * (p_ + q_) - e * d_ are updated incrementally.
+def _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_, q_, r1, r2, i):
     if i == len(p) or i == len(q):
         yield p_, q_
     else:
-        d_ = bits_to_int_le(d, i)
-        c1 = ((N - p_ * q_) >> i) & 1
-        c2 = ((k * (N + 1) + 1 - k * (p_ + q_) - e * d_) >> (i + tk)) & 1
+        c1 = (r1 >> i) & 1
+        c2 = (r2 >> (i + tk)) & 1
         p_prev = p[i]
         q_prev = q[i]
         d_prev = 0 if i + tk >= len(d) else d[i + tk]
@@ -105,7 +131,11 @@ def _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_, q_, i):
                 q[i] = q_bit
                 if i + tk < len(d):
                     d[i + tk] = d_bit
-                yield from _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_ | (p_bit << i), q_ | (q_bit << i), i + 1)
+                # Bit i of d is always known at this point (either corrected or set at a previous level).
+                d_i = d[i] if i < len(d) else 0
+                r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+                r2_ = r2 - ((k * (p_bit + q_bit) + e * d_i) << i)
+                yield from _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_ | (p_bit << i), q_ | (q_bit << i), r1_, r2_, i + 1)
 
         p[i] = p_prev
         q[i] = q_prev
@@ -114,17 +144,16 @@ def _branch_and_prune_pqd(N, e, k, tk, p, q, d, p_, q_, i):
 
 
 # Branch and prune for the case with p, q, d, dp, and dq bits known.
-def _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_, q_, i):
+# r1 = N - p_ * q_, r2 = k * (N + 1) + 1 - k * (p_ + q_) - e * d_,
+# r3 = kp * (p_ - 1) + 1 - e * dp_, and r4 = kq * (q_ - 1) + 1 - e * dq_ are updated incrementally.
+def _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_, q_, r1, r2, r3, r4, i):
     if i == len(p) or i == len(q):
         yield p_, q_
     else:
-        d_ = bits_to_int_le(d, i)
-        dp_ = bits_to_int_le(dp, i)
-        dq_ = bits_to_int_le(dq, i)
-        c1 = ((N - p_ * q_) >> i) & 1
-        c2 = ((k * (N + 1) + 1 - k * (p_ + q_) - e * d_) >> (i + tk)) & 1
-        c3 = ((kp * (p_ - 1) + 1 - e * dp_) >> (i + tkp)) & 1
-        c4 = ((kq * (q_ - 1) + 1 - e * dq_) >> (i + tkq)) & 1
+        c1 = (r1 >> i) & 1
+        c2 = (r2 >> (i + tk)) & 1
+        c3 = (r3 >> (i + tkp)) & 1
+        c4 = (r4 >> (i + tkq)) & 1
         p_prev = p[i]
         q_prev = q[i]
         d_prev = 0 if i + tk >= len(d) else d[i + tk]
@@ -146,7 +175,15 @@ def _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_
                     dp[i + tkp] = dp_bit
                 if i + tkq < len(dq):
                     dq[i + tkq] = dq_bit
-                yield from _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_ | (p_bit << i), q_ | (q_bit << i), i + 1)
+                # Bit i of d, dp, and dq is always known at this point (either corrected or set at a previous level).
+                d_i = d[i] if i < len(d) else 0
+                dp_i = dp[i] if i < len(dp) else 0
+                dq_i = dq[i] if i < len(dq) else 0
+                r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+                r2_ = r2 - ((k * (p_bit + q_bit) + e * d_i) << i)
+                r3_ = r3 + ((kp * p_bit - e * dp_i) << i)
+                r4_ = r4 + ((kq * q_bit - e * dq_i) << i)
+                yield from _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_ | (p_bit << i), q_ | (q_bit << i), r1_, r2_, r3_, r4_, i + 1)
 
         p[i] = p_prev
         q[i] = q_prev
@@ -158,6 +195,131 @@ def _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p, q, d, dp, dq, p_
             dq[i + tkq] = dq_prev
 
 
+# Converts a list of bits (with None for unknown bits) to a mask and a value.
+def _known_mask_and_value(bits):
+    mask = 0
+    value = 0
+    for i, b in enumerate(bits):
+        if b is not None:
+            mask |= 1 << i
+            value |= b << i
+
+    return mask, value
+
+
+# Counts the known bits in a window which differ from the candidate.
+def _window_distance(x, mask, value, start, t):
+    window = ((1 << t) - 1) << start
+    return bin((x ^ value) & mask & window).count("1")
+
+
+# Counts the known bits in a window.
+def _window_known(mask, start, t):
+    window = ((1 << t) - 1) << start
+    return bin(mask & window).count("1")
+
+
+# Returns the number of wrong bits which is tolerated in a window of t bits for m integers, if all bits are known.
+# More information: Henecka W. et al., "Correcting Errors in RSA Private Keys" (Section 3)
+def _noisy_threshold(m, t):
+    gamma = sqrt((1 + 1 / t) * log(2) / (2 * m))
+    return m * t * (1 / 2 - gamma)
+
+
+# Expands a candidate by t bits for the case with p and q bits known, ignoring the known bits.
+def _expand_pq(p_, q_, r1, i, t):
+    if t == 0:
+        yield p_, q_, r1
+    else:
+        c1 = (r1 >> i) & 1
+        for p_bit in [0, 1]:
+            # Addition modulo 2 is just xor.
+            q_bit = p_bit ^ c1
+            r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+            yield from _expand_pq(p_ | (p_bit << i), q_ | (q_bit << i), r1_, i + 1, t - 1)
+
+
+# Returns the bit of x at position j, if it is fixed (corrected or beyond the bit length).
+def _fixed_bit(fixed_mask, fixed_value, length, j):
+    if j >= length or (fixed_mask >> j) & 1:
+        return (fixed_value >> j) & 1
+
+
+# Expands a candidate by t bits for the case with p, q, and d bits known, ignoring the known (but not the corrected) bits.
+def _expand_pqd(e, k, tk, d_fixed, p_, q_, d_, r1, r2, i, t):
+    if t == 0:
+        yield p_, q_, d_, r1, r2
+    else:
+        c1 = (r1 >> i) & 1
+        c2 = (r2 >> (i + tk)) & 1
+        # Addition modulo 2 is just xor.
+        d_bit = c2 ^ c1
+        d_fixed_bit = _fixed_bit(*d_fixed, i + tk)
+        if d_fixed_bit is not None and d_fixed_bit != d_bit:
+            return
+
+        d_ |= d_bit << (i + tk)
+        d_i = (d_ >> i) & 1
+        for p_bit in [0, 1]:
+            q_bit = p_bit ^ c1
+            r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+            r2_ = r2 - ((k * (p_bit + q_bit) + e * d_i) << i)
+            yield from _expand_pqd(e, k, tk, d_fixed, p_ | (p_bit << i), q_ | (q_bit << i), d_, r1_, r2_, i + 1, t - 1)
+
+
+# Expands a candidate by t bits for the case with p, q, d, dp, and dq bits known, ignoring the known (but not the corrected) bits.
+def _expand_pqddpdq(e, k, tk, kp, tkp, kq, tkq, d_fixed, dp_fixed, dq_fixed, p_, q_, d_, dp_, dq_, r1, r2, r3, r4, i, t):
+    if t == 0:
+        yield p_, q_, d_, dp_, dq_, r1, r2, r3, r4
+    else:
+        c1 = (r1 >> i) & 1
+        c2 = (r2 >> (i + tk)) & 1
+        c3 = (r3 >> (i + tkp)) & 1
+        c4 = (r4 >> (i + tkq)) & 1
+        # Addition modulo 2 is just xor.
+        d_bit = c2 ^ c1
+        d_fixed_bit = _fixed_bit(*d_fixed, i + tk)
+        if d_fixed_bit is not None and d_fixed_bit != d_bit:
+            return
+
+        d_ |= d_bit << (i + tk)
+        d_i = (d_ >> i) & 1
+        for p_bit in [0, 1]:
+            q_bit = p_bit ^ c1
+            dp_bit = c3 ^ p_bit
+            dq_bit = c4 ^ q_bit
+            dp_fixed_bit = _fixed_bit(*dp_fixed, i + tkp)
+            dq_fixed_bit = _fixed_bit(*dq_fixed, i + tkq)
+            if (dp_fixed_bit is not None and dp_fixed_bit != dp_bit) or (dq_fixed_bit is not None and dq_fixed_bit != dq_bit):
+                continue
+
+            dp__ = dp_ | (dp_bit << (i + tkp))
+            dq__ = dq_ | (dq_bit << (i + tkq))
+            dp_i = (dp__ >> i) & 1
+            dq_i = (dq__ >> i) & 1
+            r1_ = r1 - ((p_bit * q_ + q_bit * p_) << i) - ((p_bit & q_bit) << (2 * i))
+            r2_ = r2 - ((k * (p_bit + q_bit) + e * d_i) << i)
+            r3_ = r3 + ((kp * p_bit - e * dp_i) << i)
+            r4_ = r4 + ((kq * q_bit - e * dq_i) << i)
+            yield from _expand_pqddpdq(e, k, tk, kp, tkp, kq, tkq, d_fixed, dp_fixed, dq_fixed, p_ | (p_bit << i), q_ | (q_bit << i), d_, dp__, dq__, r1_, r2_, r3_, r4_, i + 1, t - 1)
+
+
+# Noisy branch and prune: expands every candidate by t bits at a time, keeping only the candidates with few wrong known bits in the window.
+# distance(candidate, i, t) returns the number of wrong known bits of a candidate in the window of t bits starting at i.
+# known(i, t) returns the number of known bits of the m integers in the window of t bits starting at i.
+def _noisy_branch_and_prune(expand, distance, known, candidates, n, m, t, c):
+    i = 1
+    while i < n:
+        t_ = min(t, n - i)
+        # c wrong bits are tolerated if all m * t bits are known, so it is scaled by the number of known bits which are actually compared.
+        c_ = round(c * known(i, t_) / (m * t))
+        candidates = [candidate_ for candidate in candidates for candidate_ in expand(candidate, i, t_) if distance(candidate_, i, t_) <= c_]
+        logging.debug(f"Found {len(candidates)} candidates after {i + t_} bits")
+        i += t_
+
+    return candidates
+
+
 def factorize_pq(N, p, q):
     """
     Factorizes n when some bits of p and q are known.
@@ -183,12 +345,12 @@ def factorize_pq(N, p, q):
     q_bits[0] = 1
 
     logging.info("Starting branch and prune algorithm...")
-    for p, q in _branch_and_prune_pq(N, p_bits, q_bits, p_bits[0], q_bits[0], 1):
+    for p, q in _branch_and_prune_pq(N, p_bits, q_bits, 1, 1, N - 1, 1):
         if p * q == N:
             return int(p), int(q)
 
 
-def factorize_pqd(N, e, p, q, d):
+def factorize_pqd(N, e, p, q, d, workers=1):
     """
     Factorizes n when some bits of p, q, and d are known.
     If at least 42% of the bits are known, this attack should be polynomial time, however, smaller percentages might still work.
@@ -198,6 +360,7 @@ def factorize_pqd(N, e, p, q, d):
     :param p: partial p (PartialInteger)
     :param q: partial q (PartialInteger)
     :param d: partial d (PartialInteger)
+    :param workers: the number of worker processes to find k (default: 1, None means the number of CPUs)
     :return: a tuple containing the prime factors
     """
     assert p.bit_length == q.bit_length, "p and q should be of equal bit length."
@@ -220,7 +383,7 @@ def factorize_pqd(N, e, p, q, d):
 
     # Because e is small, k can be found by brute force.
     logging.info("Brute forcing k...")
-    k, d__bits = _find_k(N, e, d_bits)
+    k, d__bits = _find_k(N, e, d_bits, workers)
     logging.info(f"Found {k = }")
 
     _correct_msb(d_bits, d__bits)
@@ -228,13 +391,15 @@ def factorize_pqd(N, e, p, q, d):
     tk = _tau(k)
     _correct_lsb(e, d_bits, 2 + tk)
 
+    r1 = N - 1
+    r2 = k * (N + 1) + 1 - 2 * k - e * d_bits[0]
     logging.info("Starting branch and prune algorithm...")
-    for p, q in _branch_and_prune_pqd(N, e, k, tk, p_bits, q_bits, d_bits, p_bits[0], q_bits[0], 1):
+    for p, q in _branch_and_prune_pqd(N, e, k, tk, p_bits, q_bits, d_bits, 1, 1, r1, r2, 1):
         if p * q == N:
             return int(p), int(q)
 
 
-def factorize_pqddpdq(N, e, p, q, d, dp, dq):
+def factorize_pqddpdq(N, e, p, q, d, dp, dq, workers=1):
     """
     Factorizes n when some bits of p, q, d, dp, and dq are known.
     If at least 27% of the bits are known, this attack should be polynomial time, however, smaller percentages might still work.
@@ -246,6 +411,7 @@ def factorize_pqddpdq(N, e, p, q, d, dp, dq):
     :param d: partial d (PartialInteger)
     :param dp: partial dp (PartialInteger)
     :param dq: partial dq (PartialInteger)
+    :param workers: the number of worker processes to find k (default: 1, None means the number of CPUs)
     :return: a tuple containing the prime factors
     """
     assert p.bit_length == q.bit_length, "p and q should be of equal bit length."
@@ -268,7 +434,7 @@ def factorize_pqddpdq(N, e, p, q, d, dp, dq):
 
     # Because e is small, k can be found by brute force.
     logging.info("Brute forcing k...")
-    k, d__bits = _find_k(N, e, d_bits)
+    k, d__bits = _find_k(N, e, d_bits, workers)
     logging.info(f"Found {k = }")
 
     _correct_msb(d_bits, d__bits)
@@ -300,7 +466,237 @@ def factorize_pqddpdq(N, e, p, q, d, dp, dq):
         tkq = _tau(kq)
         _correct_lsb(e, dq_bits, 1 + tkq)
 
+        r1 = N - 1
+        r2 = k * (N + 1) + 1 - 2 * k - e * d_bits[0]
+        r3 = 1 - e * dp_bits[0]
+        r4 = 1 - e * dq_bits[0]
         logging.info("Starting branch and prune algorithm...")
-        for p, q in _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p_bits, q_bits, d_bits, dp_bits, dq_bits, p_bits[0], q_bits[0], 1):
+        for p, q in _branch_and_prune_pqddpdq(N, e, k, tk, kp, tkp, kq, tkq, p_bits, q_bits, d_bits, dp_bits, dq_bits, 1, 1, r1, r2, r3, r4, 1):
+            if p * q == N:
+                return int(p), int(q)
+
+
+def factorize_pq_noisy(N, p, q, t=10, c=None):
+    """
+    Factorizes n when noisy bits of p and q are known (some of the known bits might be wrong).
+    Unknown bits are never counted as wrong.
+    More information: Henecka W. et al., "Correcting Errors in RSA Private Keys"
+    :param N: the modulus
+    :param p: noisy partial p (PartialInteger)
+    :param q: noisy partial q (PartialInteger)
+    :param t: the number of bits to expand at a time (default: 10)
+    :param c: the maximum number of wrong bits in a window of 2t bits, scaled by the fraction of known bits in the window (default: computed as in the paper)
+    :return: a tuple containing the prime factors, or None if the factors were not found
+    """
+    assert p.bit_length == q.bit_length, "p and q should be of equal bit length."
+
+    p_bits = p.to_bits_le()
+    for i, b in enumerate(p_bits):
+        p_bits[i] = None if b == '?' else int(b, 2)
+
+    q_bits = q.to_bits_le()
+    for i, b in enumerate(q_bits):
+        q_bits[i] = None if b == '?' else int(b, 2)
+
+    p_known = _known_mask_and_value(p_bits)
+    q_known = _known_mask_and_value(q_bits)
+    if c is None:
+        c = _noisy_threshold(2, t)
+
+    def expand(candidate, i, t):
+        return _expand_pq(*candidate, i, t)
+
+    def distance(candidate, i, t):
+        p_, q_, _ = candidate
+        return _window_distance(p_, *p_known, i, t) + _window_distance(q_, *q_known, i, t)
+
+    def known(i, t):
+        return _window_known(p_known[0], i, t) + _window_known(q_known[0], i, t)
+
+    # p and q are prime, odd.
+    logging.info(f"Starting noisy branch and prune algorithm with {t = } and {c = :.1f}...")
+    for p, q, _ in _noisy_branch_and_prune(expand, distance, known, [(1, 1, N - 1)], len(p_bits), 2, t, c):
+        if p * q == N:
+            return int(p), int(q)
+
+
+def factorize_pqd_noisy(N, e, p, q, d, t=10, c=None, workers=1):
+    """
+    Factorizes n when noisy bits of p, q, and d are known (some of the known bits might be wrong).
+    Unknown bits are never counted as wrong.
+    More information: Henecka W. et al., "Correcting Errors in RSA Private Keys"
+    :param N: the modulus
+    :param e: the public exponent
+    :param p: noisy partial p (PartialInteger)
+    :param q: noisy partial q (PartialInteger)
+    :param d: noisy partial d (PartialInteger)
+    :param t: the number of bits to expand at a time (default: 10)
+    :param c: the maximum number of wrong bits in a window of 3t bits, scaled by the fraction of known bits in the window (default: computed as in the paper)
+    :param workers: the number of worker processes to find k (default: 1, None means the number of CPUs)
+    :return: a tuple containing the prime factors, or None if the factors were not found
+    """
+    assert p.bit_length == q.bit_length, "p and q should be of equal bit length."
+
+    p_bits = p.to_bits_le()
+    for i, b in enumerate(p_bits):
+        p_bits[i] = None if b == '?' else int(b, 2)
+
+    q_bits = q.to_bits_le()
+    for i, b in enumerate(q_bits):
+        q_bits[i] = None if b == '?' else int(b, 2)
+
+    d_bits = d.to_bits_le()
+    for i, b in enumerate(d_bits):
+        d_bits[i] = None if b == '?' else int(b, 2)
+
+    # Because e is small, k can be found by brute force.
+    logging.info("Brute forcing k...")
+    k, d__bits = _find_k(N, e, d_bits, workers)
+    logging.info(f"Found {k = }")
+
+    # The most significant half of d is more reliable than the noisy bits, but it might still contain some wrong bits.
+    _correct_msb(d_bits, d__bits)
+
+    p_known = _known_mask_and_value(p_bits)
+    q_known = _known_mask_and_value(q_bits)
+    d_mask, d_value = _known_mask_and_value(d_bits)
+
+    # The corrected least significant bits of d are always correct, so they are not counted as wrong.
+    d_fixed_bits = [None] * len(d_bits)
+    tk = _tau(k)
+    _correct_lsb(e, d_fixed_bits, 2 + tk)
+    d_fixed_mask, d_fixed_value = _known_mask_and_value(d_fixed_bits)
+    d_fixed = (d_fixed_mask, d_fixed_value, len(d_bits))
+    d_known = (d_mask & ~d_fixed_mask, d_value)
+    if c is None:
+        c = _noisy_threshold(3, t)
+
+    def expand(candidate, i, t):
+        return _expand_pqd(e, k, tk, d_fixed, *candidate, i, t)
+
+    def distance(candidate, i, t):
+        p_, q_, d_, _, _ = candidate
+        return _window_distance(p_, *p_known, i, t) + _window_distance(q_, *q_known, i, t) + _window_distance(d_, *d_known, i + tk, t)
+
+    def known(i, t):
+        return _window_known(p_known[0], i, t) + _window_known(q_known[0], i, t) + _window_known(d_known[0], i + tk, t)
+
+    # p and q are prime, odd.
+    d_ = d_fixed_value & ((1 << (1 + tk)) - 1)
+    r1 = N - 1
+    r2 = k * (N + 1) + 1 - 2 * k - e * (d_ & 1)
+    logging.info(f"Starting noisy branch and prune algorithm with {t = } and {c = :.1f}...")
+    for p, q, _, _, _ in _noisy_branch_and_prune(expand, distance, known, [(1, 1, d_, r1, r2)], len(p_bits), 3, t, c):
+        if p * q == N:
+            return int(p), int(q)
+
+
+def factorize_pqddpdq_noisy(N, e, p, q, d, dp, dq, t=10, c=None, workers=1):
+    """
+    Factorizes n when noisy bits of p, q, d, dp, and dq are known (some of the known bits might be wrong).
+    Unknown bits are never counted as wrong.
+    More information: Henecka W. et al., "Correcting Errors in RSA Private Keys"
+    :param N: the modulus
+    :param e: the public exponent
+    :param p: noisy partial p (PartialInteger)
+    :param q: noisy partial q (PartialInteger)
+    :param d: noisy partial d (PartialInteger)
+    :param dp: noisy partial dp (PartialInteger)
+    :param dq: noisy partial dq (PartialInteger)
+    :param t: the number of bits to expand at a time (default: 10)
+    :param c: the maximum number of wrong bits in a window of 5t bits, scaled by the fraction of known bits in the window (default: computed as in the paper)
+    :param workers: the number of worker processes to find k (default: 1, None means the number of CPUs)
+    :return: a tuple containing the prime factors, or None if the factors were not found
+    """
+    assert p.bit_length == q.bit_length, "p and q should be of equal bit length."
+
+    p_bits = p.to_bits_le()
+    for i, b in enumerate(p_bits):
+        p_bits[i] = None if b == '?' else int(b, 2)
+
+    q_bits = q.to_bits_le()
+    for i, b in enumerate(q_bits):
+        q_bits[i] = None if b == '?' else int(b, 2)
+
+    d_bits = d.to_bits_le()
+    for i, b in enumerate(d_bits):
+        d_bits[i] = None if b == '?' else int(b, 2)
+
+    dp_bits = dp.to_bits_le()
+    for i, b in enumerate(dp_bits):
+        dp_bits[i] = None if b == '?' else int(b, 2)
+
+    dq_bits = dq.to_bits_le()
+    for i, b in enumerate(dq_bits):
+        dq_bits[i] = None if b == '?' else int(b, 2)
+
+    # Because e is small, k can be found by brute force.
+    logging.info("Brute forcing k...")
+    k, d__bits = _find_k(N, e, d_bits, workers)
+    logging.info(f"Found {k = }")
+
+    # The most significant half of d is more reliable than the noisy bits, but it might still contain some wrong bits.
+    _correct_msb(d_bits, d__bits)
+
+    p_known = _known_mask_and_value(p_bits)
+    q_known = _known_mask_and_value(q_bits)
+    d_mask, d_value = _known_mask_and_value(d_bits)
+    dp_mask, dp_value = _known_mask_and_value(dp_bits)
+    dq_mask, dq_value = _known_mask_and_value(dq_bits)
+
+    # The corrected least significant bits of d, dp, and dq are always correct, so they are not counted as wrong.
+    d_fixed_bits = [None] * len(d_bits)
+    tk = _tau(k)
+    _correct_lsb(e, d_fixed_bits, 2 + tk)
+    d_fixed_mask, d_fixed_value = _known_mask_and_value(d_fixed_bits)
+    d_fixed = (d_fixed_mask, d_fixed_value, len(d_bits))
+    d_known = (d_mask & ~d_fixed_mask, d_value)
+    if c is None:
+        c = _noisy_threshold(5, t)
+
+    x = Zmod(e)["x"].gen()
+    f = x ** 2 - x * (k * (N - 1) + 1) - k
+    logging.info("Computing kp and kq...")
+    for kp in f.roots(multiplicities=False):
+        kp = int(kp)
+        kq = (-pow(kp, -1, e) * k) % e
+        logging.info(f"Trying {kp = } and {kq = }...")
+
+        dp_fixed_bits = [None] * len(dp_bits)
+        tkp = _tau(kp)
+        _correct_lsb(e, dp_fixed_bits, 1 + tkp)
+        dp_fixed_mask, dp_fixed_value = _known_mask_and_value(dp_fixed_bits)
+        dp_fixed = (dp_fixed_mask, dp_fixed_value, len(dp_bits))
+        dp_known = (dp_mask & ~dp_fixed_mask, dp_value)
+
+        dq_fixed_bits = [None] * len(dq_bits)
+        tkq = _tau(kq)
+        _correct_lsb(e, dq_fixed_bits, 1 + tkq)
+        dq_fixed_mask, dq_fixed_value = _known_mask_and_value(dq_fixed_bits)
+        dq_fixed = (dq_fixed_mask, dq_fixed_value, len(dq_bits))
+        dq_known = (dq_mask & ~dq_fixed_mask, dq_value)
+
+        def expand(candidate, i, t):
+            return _expand_pqddpdq(e, k, tk, kp, tkp, kq, tkq, d_fixed, dp_fixed, dq_fixed, *candidate, i, t)
+
+        def distance(candidate, i, t):
+            p_, q_, d_, dp_, dq_, _, _, _, _ = candidate
+            return _window_distance(p_, *p_known, i, t) + _window_distance(q_, *q_known, i, t) + \
+                _window_distance(d_, *d_known, i + tk, t) + _window_distance(dp_, *dp_known, i + tkp, t) + _window_distance(dq_, *dq_known, i + tkq, t)
+
+        def known(i, t):
+            return _window_known(p_known[0], i, t) + _window_known(q_known[0], i, t) + \
+                _window_known(d_known[0], i + tk, t) + _window_known(dp_known[0], i + tkp, t) + _window_known(dq_known[0], i + tkq, t)
+
+        # p and q are prime, odd.
+        d_ = d_fixed_value & ((1 << (1 + tk)) - 1)
+        dp_ = dp_fixed_value & ((1 << (1 + tkp)) - 1)
+        dq_ = dq_fixed_value & ((1 << (1 + tkq)) - 1)
+        r1 = N - 1
+        r2 = k * (N + 1) + 1 - 2 * k - e * (d_ & 1)
+        r3 = 1 - e * (dp_ & 1)
+        r4 = 1 - e * (dq_ & 1)
+        logging.info(f"Starting noisy branch and prune algorithm with {t = } and {c = :.1f}...")
+        for p, q, *_ in _noisy_branch_and_prune(expand, distance, known, [(1, 1, d_, dp_, dq_, r1, r2, r3, r4)], len(p_bits), 5, t, c):
             if p * q == N:
                 return int(p), int(q)
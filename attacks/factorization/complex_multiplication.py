@@ -5,30 +5,33 @@ from math import gcd
 
 from sage.all import EllipticCurve
 from sage.all import Zmod
-from sage.all import hilbert_class_polynomial
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
+from shared.complex_multiplication import hilbert_class_polynomial
+from shared.parallel import parallel_first
 from shared.polynomial import polynomial_inverse
 from shared.polynomial import polynomial_xgcd
 
 
-def factorize(N, D):
+def factorize(N, D, attempts=None, cache_dir=None):
     """
     Recovers the prime factors from a modulus using Cheng's elliptic curve complex multiplication method.
     More information: Sedlacek V. et al., "I want to break square-free: The 4p - 1 factorization method and its RSA backdoor viability"
     :param N: the modulus
     :param D: the discriminant to use to generate the Hilbert polynomial
-    :return: a tuple containing the prime factors
+    :param attempts: the maximum number of random points to try (default: no maximum)
+    :param cache_dir: the directory to persist the Hilbert class polynomials in (default: None, the polynomials are only cached in memory)
+    :return: a tuple containing the prime factors, or None if the factors were not found
     """
     assert D % 8 == 3, "D should be square-free"
 
     zmodn = Zmod(N)
     pr = zmodn["x"]
 
-    H = pr(hilbert_class_polynomial(-D))
+    H = pr(hilbert_class_polynomial(-D, cache_dir))
     Q = pr.quotient(H)
     j = Q.gen()
 
@@ -37,10 +40,13 @@ def factorize(N, D):
     except ArithmeticError as err:
         # If some polynomial was not invertible during XGCD calculation, we can factor n.
         p = gcd(int(err.args[1].lc()), N)
-        return int(p), int(N // p)
+        # Without the inverse, the curve can't be constructed.
+        return (int(p), int(N // p)) if 1 < p < N else None
 
     E = EllipticCurve(Q, [3 * k, 2 * k])
-    while True:
+    attempt = 0
+    while attempts is None or attempt < attempts:
+        attempt += 1
         x = zmodn.random_element()
 
         logging.debug(f"Calculating division polynomial of Q{x}...")
@@ -51,8 +57,35 @@ def factorize(N, D):
         except ArithmeticError as err:
             # If some polynomial was not invertible during XGCD calculation, we can factor n.
             p = gcd(int(err.args[1].lc()), N)
-            return int(p), int(N // p)
+            if 1 < p < N:
+                return int(p), int(N // p)
+
+            continue
 
         p = gcd(int(d), N)
         if 1 < p < N:
             return int(p), int(N // p)
+
+    return None
+
+
+def factorize_sweep(N, Ds, attempts=4, workers=1, cache_dir=None):
+    """
+    Recovers the prime factors from a modulus using Cheng's elliptic curve complex multiplication method, trying many discriminants.
+    Discriminants which are not 3 mod 8 are skipped.
+    :param N: the modulus
+    :param Ds: the discriminants to try
+    :param attempts: the maximum number of random points to try for every discriminant (default: 4)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param cache_dir: the directory to persist the Hilbert class polynomials in, which is shared by the worker processes (default: None, the polynomials are only cached in memory)
+    :return: a tuple containing the prime factors, or None if the factors were not found
+    """
+    Ds = [D for D in Ds if D % 8 == 3]
+    logging.info(f"Trying {len(Ds)} discriminants...")
+    result = parallel_first(factorize, [(N, D, attempts, cache_dir) for D in Ds], workers, progress=True)
+    if result is None:
+        return None
+
+    i, factors = result
+    logging.info(f"Found the factors using D = {Ds[i]}")
+    return factors
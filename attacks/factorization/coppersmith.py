@@ -1,8 +1,11 @@
 import logging
 import os
 import sys
+import time
 from math import ceil
+from math import comb
 from math import log
+from math import log2
 from math import pi
 from math import sqrt
 
@@ -13,9 +16,29 @@ path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
+from shared.parallel import parallel_first
+from shared.polynomial import max_norm
 from shared.small_roots import coron_direct
 from shared.small_roots import herrmann_may_multivariate
 from shared.small_roots import howgrave_graham
+from shared.small_roots import jochemsz_may_integer
+
+
+def _get_parameters(n, beta, epsilon, m=None, t=None):
+    if n == 1:
+        m = ceil(max(beta ** 2 / epsilon, 7 * beta)) if m is None else m
+        t = int((1 / beta - 1) * m) if t is None else t
+        small_roots = howgrave_graham.modular_univariate
+    elif n == 2:
+        m = ceil((3 * beta * (1 + sqrt(1 - beta))) / epsilon) if m is None else m
+        t = int((1 - sqrt(1 - beta)) * m) if t is None else t
+        small_roots = herrmann_may_multivariate.modular_multivariate
+    else:
+        m = ceil((n * (1 / pi * (1 - beta) ** (-0.278465) - beta * log(1 - beta))) / epsilon) if m is None else m
+        t = int((1 - (1 - beta) ** (1 / n)) * m) if t is None else t
+        small_roots = herrmann_may_multivariate.modular_multivariate
+
+    return m, t, small_roots
 
 
 def factorize_p(N, partial_p, beta=0.5, epsilon=0.125, m=None, t=None):
@@ -33,18 +56,7 @@ def factorize_p(N, partial_p, beta=0.5, epsilon=0.125, m=None, t=None):
     """
     n = partial_p.unknowns
     assert n > 0
-    if n == 1:
-        m = ceil(max(beta ** 2 / epsilon, 7 * beta)) if m is None else m
-        t = int((1 / beta - 1) * m) if t is None else t
-        small_roots = howgrave_graham.modular_univariate
-    elif n == 2:
-        m = ceil((3 * beta * (1 + sqrt(1 - beta))) / epsilon) if m is None else m
-        t = int((1 - sqrt(1 - beta)) * m) if t is None else t
-        small_roots = herrmann_may_multivariate.modular_multivariate
-    else:
-        m = ceil((n * (1 / pi * (1 - beta) ** (-0.278465) - beta * log(1 - beta))) / epsilon) if m is None else m
-        t = int((1 - (1 - beta) ** (1 / n)) * m) if t is None else t
-        small_roots = herrmann_may_multivariate.modular_multivariate
+    m, t, small_roots = _get_parameters(n, beta, epsilon, m, t)
 
     x = Zmod(N)[tuple(f"x{i}" for i in range(n))].gens()
     f = partial_p.sub(x)
@@ -58,35 +70,180 @@ def factorize_p(N, partial_p, beta=0.5, epsilon=0.125, m=None, t=None):
     return None
 
 
-def factorize_pq(N, partial_p, partial_q, k=None):
+def _factorize_p_attempt(N, partial_p, beta, m, t):
+    start = time.time()
+    factors = factorize_p(N, partial_p, beta, m=m, t=t)
+    logging.info(f"Attempt with {m = }, {t = } took {time.time() - start:.3f} seconds")
+    return factors
+
+
+# Lattice dimension and log2 of the determinant of the Herrmann-May lattice, with x0 the leading variable of the shifts.
+def _herrmann_may_log_det(m, t, log_X, log_N):
+    n = len(log_X)
+    d = 0
+    log_det = 0
+    for k in range(m + 1):
+        # There are comb(s + n - 2, n - 2) shifts x1^i1 * ... * x(n-1)^i(n-1) * f^k with i1 + ... + i(n-1) = s, and every variable contributes s / (n - 1) on average.
+        for s in range(m - k + 1):
+            count = comb(s + n - 2, n - 2)
+            d += count
+            log_det += count * (k * log_X[0] + s * sum(log_X[1:]) / (n - 1) + max(t - k, 0) * log_N)
+
+    return d, log_det
+
+
+def factorize_p_sweep(N, partial_p, beta=0.5, max_m=None, workers=1, timeout=None):
+    """
+    Recover the prime factors from a modulus using Coppersmith's method and bits of one prime factor p are known.
+    Instead of trying a single lattice, this method tries increasing values of m (and t), until the factors are found or the time runs out.
+    Configurations which can not satisfy the Howgrave-Graham bound are skipped.
+    More information: Herrmann M., May A., "Solving Linear Equations Modulo Divisors: On Factoring Given Any Bits" (Section 4)
+    :param N: the modulus
+    :param partial_p: the partial prime factor p (PartialInteger)
+    :param beta: the parameter beta (default: 0.5)
+    :param max_m: the maximum number of normal shifts to try (default: automatically computed using beta and the unknown bounds)
+    :param workers: the number of worker processes to try configurations in parallel (default: 1, None means the number of CPUs)
+    :param timeout: the maximum number of seconds to spend, a running attempt is not interrupted if workers is 1 (default: no limit)
+    :return: a tuple containing the prime factors and the parameters m and t which found them, or None if the factors could not be found
+    """
+    n = partial_p.unknowns
+    assert n > 0
+    log_N = log2(int(N))
+    log_X = [log2(int(X)) for X in partial_p.get_unknown_bounds()]
+    gamma = sum(log_X) / log_N
+    if max_m is None:
+        # The asymptotic bound on the sum of the unknown sizes (Theorem 7), which is beta^2 for a single unknown component.
+        bound = 1 - (1 - beta) ** ((n + 1) / n) - (n + 1) * (1 - (1 - beta) ** (1 / n)) * (1 - beta)
+        epsilon = bound - gamma
+        if epsilon <= 0:
+            logging.warning(f"The unknown components are too large for the asymptotic bound ({gamma = }, {bound = })")
+            epsilon = 0.01
+
+        max_m, _, _ = _get_parameters(n, beta, epsilon)
+
+    args = []
+    for m in range(1, max_m + 1):
+        _, t, _ = _get_parameters(n, beta, None, m)
+        if n == 1:
+            # Lattice dimension and determinant of the Howgrave-Graham lattice, we need det^(1 / d) < N^(beta * m) / sqrt(d).
+            d = m + t
+            log_det = m * (m + 1) / 2 * log_N + d * (d - 1) / 2 * gamma * log_N
+            log_bound = beta * m * log_N
+        else:
+            # The Herrmann-May lattice finds roots modulo p^t, so we need det^(1 / d) < N^(beta * t) / sqrt(d).
+            d, log_det = _herrmann_may_log_det(m, t, log_X, log_N)
+            log_bound = beta * t * log_N
+
+        if log_det / d >= log_bound - log2(d) / 2:
+            logging.debug(f"Skipping {m = }, {t = }...")
+            continue
+
+        args.append((N, partial_p, beta, m, t))
+
+    logging.info(f"Trying {len(args)} configurations with m <= {max_m}...")
+    result = parallel_first(_factorize_p_attempt, args, workers, timeout)
+    if result is None:
+        return None
+
+    i, (p, q) = result
+    _, _, _, m, t = args[i]
+    logging.info(f"Found the factors using {m = }, {t = }")
+    return p, q, m, t
+
+
+def _create_polynomial_pq(N, partial_p, partial_q):
+    np = partial_p.unknowns
+    nq = partial_q.unknowns
+    x = ZZ[tuple(f"x{i}" for i in range(np + nq))].gens()
+    f = partial_p.sub(x[:np]) * partial_q.sub(x[np:]) - N
+    X = partial_p.get_unknown_bounds() + partial_q.get_unknown_bounds()
+    return f, X
+
+
+def _estimate_jochemsz_may(f, m, strategy, W, X):
+    x = f.parent().gens()
+    S, M = strategy.generate_S_M(f, m)
+    # The asymptotic condition is X1^s1 * ... * Xn^sn < W^|S|, with sj the sum of the degrees of xj in M \ S (Section 2.2).
+    log_X = 0
+    for monomial in M:
+        if monomial not in S:
+            log_X += sum(monomial.degree(xj) * log2(int(Xj)) for xj, Xj in zip(x, X))
+
+    return len(M), len(S) * log2(int(W)) - log_X
+
+
+def estimate_pq(N, partial_p, partial_q, max_m=6, max_t=3):
+    """
+    Estimates the parameters for the Jochemsz-May method, used by factorize_pq when more than two components are unknown.
+    The parameters with the smallest lattice dimension which satisfy the asymptotic condition are returned.
+    This can be used to compare the predicted cost with the cost of other methods (e.g. branch and prune).
+    More information: Jochemsz E., May A., "A Strategy for Finding Roots of Multivariate Polynomials with New Applications in Attacking RSA Variants" (Section 2.2)
+    :param N: the modulus
+    :param partial_p: the partial prime factor p (PartialInteger)
+    :param partial_q: the partial prime factor q (PartialInteger)
+    :param max_m: the maximum value of m to consider (default: 6)
+    :param max_t: the maximum number of extra shifts for the extended strategy to consider (default: 3)
+    :return: a tuple containing m, the strategy, the lattice dimension, and the margin of the asymptotic condition in bits (positive means success is expected), or None if no suitable parameters were found
+    """
+    f, X = _create_polynomial_pq(N, partial_p, partial_q)
+    n = len(X)
+    _, W = max_norm(f(*[xi * Xi for xi, Xi in zip(f.parent().gens(), X)]))
+    best = None
+    for m in range(1, max_m + 1):
+        for t in range(max_t + 1):
+            strategy = jochemsz_may_integer.BasicStrategy() if t == 0 else jochemsz_may_integer.ExtendedStrategy([t] * n)
+            dimension, margin = _estimate_jochemsz_may(f, m, strategy, W, X)
+            logging.debug(f"{m = }, {t = }: lattice dimension {dimension}, margin {margin:.1f} bits")
+            if margin > 0 and (best is None or (dimension, -margin) < (best[2], -best[3])):
+                best = m, strategy, dimension, margin
+
+    return best
+
+
+def factorize_pq(N, partial_p, partial_q, k=None, m=None, strategy=None):
     """
     Recover the prime factors from a modulus using Coppersmith's method and bits of both prime factors p and q are known.
+    If the total number of unknown components is two, Coron's method is used, otherwise the Jochemsz-May method is used.
+    More information: Jochemsz E., May A., "A Strategy for Finding Roots of Multivariate Polynomials with New Applications in Attacking RSA Variants" (Section 2.2)
     :param N: the modulus
     :param partial_p: the partial prime factor p (PartialInteger)
     :param partial_q: the partial prime factor q (PartialInteger)
     :param k: the number of shifts to use for Coron's method, must be set if the total number of unknown components is two (default: None)
+    :param m: the parameter m for the Jochemsz-May method (default: automatically chosen using estimate_pq)
+    :param strategy: the strategy for the Jochemsz-May method (default: automatically chosen using estimate_pq)
     :return: a tuple containing the prime factors, or None if the factors could not be found
     """
     np = partial_p.unknowns
     nq = partial_q.unknowns
     assert np > 0 and nq > 0
 
-    x = ZZ[tuple(f"x{i}" for i in range(np + nq))].gens()
-    f = partial_p.sub(x[:np]) * partial_q.sub(x[np:]) - N
-    Xp = partial_p.get_unknown_bounds()
-    Xq = partial_q.get_unknown_bounds()
-
+    f, X = _create_polynomial_pq(N, partial_p, partial_q)
     if np == 1 and nq == 1:
         assert k is not None, "k must be set if the total number of unknown components is two."
         logging.info(f"Trying {k = }...")
-        for x0, x1 in coron_direct.integer_bivariate(f, k, Xp[0], Xq[0]):
+        for x0, x1 in coron_direct.integer_bivariate(f, k, X[0], X[1]):
             p = partial_p.sub([x0])
             q = partial_q.sub([x1])
             if p * q == N:
                 return p, q
     else:
-        # TODO: Jochemsz-May multivariate integer roots?
-        # Or "Factoring RSA Modulus with Known Bits from Both p and q: A Lattice Method"?
-        pass
+        if m is None or strategy is None:
+            estimate = estimate_pq(N, partial_p, partial_q)
+            if estimate is None:
+                logging.warning("No parameters satisfy the asymptotic condition for the Jochemsz-May method")
+                return None
+
+            m_, strategy_, dimension, margin = estimate
+            m = m_ if m is None else m
+            strategy = strategy_ if strategy is None else strategy
+            logging.info(f"Expected lattice dimension {dimension}, asymptotic condition margin {margin:.1f} bits")
+
+        _, W = max_norm(f(*[xi * Xi for xi, Xi in zip(f.parent().gens(), X)]))
+        logging.info(f"Trying {m = }...")
+        for roots in jochemsz_may_integer.integer_multivariate(f, m, W, list(X), strategy):
+            p = partial_p.sub(roots[:np])
+            q = partial_q.sub(roots[np:])
+            if p * q == N:
+                return p, q
 
     return None
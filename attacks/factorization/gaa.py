@@ -1,32 +1,54 @@
-from math import ceil
+import os
+import sys
+from math import isqrt
 
-from sage.all import ZZ
-from sage.all import sqrt
+path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
+if sys.path[1] != path:
+    sys.path.insert(1, path)
 
+from shared import is_square
+from shared.parallel import parallel_first
+from shared.parallel import split_range
 
-def factorize(N, rp, rq):
+
+def _factorize_range(N, rp, rq, sqrt_N, start, stop):
+    for i in range(start, stop):
+        sigma = (sqrt_N - i) ** 2
+        z = (N - (rp * rq)) % sigma
+        # The integer roots of x^2 - z * x + sigma * rp * rq.
+        discriminant = z ** 2 - 4 * sigma * rp * rq
+        if discriminant < 0 or (s := is_square(discriminant)) is None or (z + s) % 2 != 0:
+            continue
+
+        for x0 in [(z + s) // 2, (z - s) // 2]:
+            for r1, r2 in [(rp, rq), (rq, rp)]:
+                if x0 % r1 == 0:
+                    p = x0 // r1 + r2
+                    if 1 < p < N and N % p == 0:
+                        return p, N // p
+
+    return None
+
+
+def factorize(N, rp, rq, max_iterations=2 ** 20, workers=1):
     """
     Recovers the prime factors from a modulus using the Ghafar-Ariffin-Asbullah attack.
     More information: Ghafar AHA. et al., "A New LSB Attack on Special-Structured RSA Primes"
     :param N: the modulus
     :param rp: the value rp
     :param rq: the value rq
-    :return: a tuple containing the prime factors
+    :param max_iterations: the maximum number of values of i to try (default: 2^20)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :return: a tuple containing the prime factors, or None if the factors were not found
     """
-    i = ceil(sqrt(rp * rq))
-    x = ZZ["x"].gen()
-    while True:
-        sigma = (round(int(sqrt(N))) - i) ** 2
-        z = (N - (rp * rq)) % sigma
-        f = x ** 2 - z * x + sigma * rp * rq
-        for x0 in f.roots(multiplicities=False):
-            if x0 % rp == 0:
-                p = int((x0 // rp) + rq)
-                assert N % p == 0
-                return p, N // p
-            if x0 % rq == 0:
-                p = int((x0 // rq) + rp)
-                assert N % p == 0
-                return p, N // p
-
+    N = int(N)
+    rp = int(rp)
+    rq = int(rq)
+    sqrt_N = isqrt(N)
+    # i starts at ceil(sqrt(rp * rq)).
+    i = isqrt(rp * rq)
+    if i ** 2 < rp * rq:
         i += 1
+
+    result = parallel_first(_factorize_range, [(N, rp, rq, sqrt_N, start, stop) for start, stop in split_range(i, i + max_iterations, workers)], workers)
+    return None if result is None else result[1]
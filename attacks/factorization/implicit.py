@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 from math import gcd
@@ -10,6 +11,7 @@ if sys.path[1] != path:
     sys.path.insert(1, path)
 
 from shared.lattice import shortest_vectors
+from shared.parallel import parallel_map
 
 
 def _recover_factors(L, N):
@@ -24,6 +26,30 @@ def _recover_factors(L, N):
             return factors
 
 
+def _create_lattice_msb(N, n, t):
+    L = matrix(ZZ, len(N), len(N))
+    L[0, 0] = 2 ** (n - t)
+    for i in range(1, len(N)):
+        L[0, i] = N[i]
+
+    for i in range(1, len(N)):
+        L[i, i] = -N[0]
+
+    return L
+
+
+def _create_lattice_lsb(N, t):
+    L = matrix(ZZ, len(N), len(N))
+    L[0, 0] = 1
+    for i in range(1, len(N)):
+        L[0, i] = N[i] * pow(N[0], -1, 2 ** t) % (2 ** t)
+
+    for i in range(1, len(N)):
+        L[i, i] = -2 ** t
+
+    return L
+
+
 def factorize_msb(N, n, t):
     """
     Factorizes the moduli when some most significant bits are equal among multiples of a prime factor.
@@ -33,15 +59,7 @@ def factorize_msb(N, n, t):
     :param t: the number of shared most significant bits
     :return: a list containing a tuple of the factors of each modulus, or None if the factors were not found
     """
-    L = matrix(ZZ, len(N), len(N))
-    L[0, 0] = 2 ** (n - t)
-    for i in range(1, len(N)):
-        L[0, i] = N[i]
-
-    for i in range(1, len(N)):
-        L[i, i] = -N[0]
-
-    return _recover_factors(L, N)
+    return _recover_factors(_create_lattice_msb(N, n, t), N)
 
 
 def factorize_lsb(N, n, t):
@@ -53,12 +71,103 @@ def factorize_lsb(N, n, t):
     :param t: the number of shared least significant bits
     :return: a list containing a tuple of the factors of each modulus, or None if the factors were not found
     """
-    L = matrix(ZZ, len(N), len(N))
-    L[0, 0] = 1
-    for i in range(1, len(N)):
-        L[0, i] = N[i] * pow(N[0], -1, 2 ** t) % (2 ** t)
+    return _recover_factors(_create_lattice_lsb(N, t), N)
 
-    for i in range(1, len(N)):
-        L[i, i] = -2 ** t
 
-    return _recover_factors(L, N)
+# Unlike _recover_factors, this also returns the factors if only some moduli could be factored.
+def _reduce_group(N, n, t, lsb):
+    L = _create_lattice_lsb(N, t) if lsb else _create_lattice_msb(N, n, t)
+    factors = {}
+    for v in shortest_vectors(L):
+        for i, Ni in enumerate(N):
+            qi = gcd(int(v[i]), Ni)
+            if i not in factors and 1 < qi < Ni:
+                factors[i] = (Ni // qi, qi)
+
+    return factors
+
+
+def _factorize_group(N, n, t, lsb):
+    factors = _reduce_group(N, n, t, lsb)
+    if factors or len(N) <= 2:
+        return factors
+
+    # A single modulus which does not share the bits prevents a short vector for the whole group, so every modulus is left out once.
+    for j in range(len(N)):
+        factors = _reduce_group(N[:j] + N[j + 1:], n, t, lsb)
+        if factors:
+            return {i if i < j else i + 1: f for i, f in factors.items()}
+
+    return {}
+
+
+def _factorize_batch(N, n, t, lsb, group_size, workers):
+    N = [int(Ni) for Ni in N]
+    factors = [None] * len(N)
+    while True:
+        remaining = [i for i in range(len(N)) if factors[i] is None]
+        if len(remaining) < 2:
+            break
+
+        # Consecutive groups overlap by half of their moduli.
+        step = max(1, group_size // 2)
+        starts = list(range(0, max(0, len(remaining) - group_size) + 1, step))
+        if starts[-1] + group_size < len(remaining):
+            starts.append(len(remaining) - group_size)
+
+        groups = [remaining[start:start + group_size] for start in starts]
+        logging.info(f"Reducing {len(groups)} groups for {len(remaining)} remaining moduli...")
+        found = 0
+        for group, group_factors in zip(groups, parallel_map(_factorize_group, [([N[i] for i in group], n, t, lsb) for group in groups], workers)):
+            for j, (p, q) in group_factors.items():
+                if factors[group[j]] is None:
+                    factors[group[j]] = (p, q)
+                    found += 1
+
+        # Recovered primes might also divide other moduli directly.
+        primes = set(f for factor in factors if factor is not None for f in factor)
+        for i in remaining:
+            if factors[i] is None:
+                for prime in primes:
+                    if 1 < prime < N[i] and N[i] % prime == 0:
+                        factors[i] = (max(prime, N[i] // prime), min(prime, N[i] // prime))
+                        found += 1
+                        break
+
+        logging.info(f"Factored {found} moduli")
+        if found == 0:
+            break
+
+    return factors
+
+
+def factorize_msb_batch(N, n, t, group_size=16, workers=1):
+    """
+    Factorizes many moduli when some most significant bits are equal among multiples of a prime factor.
+    The moduli are partitioned into overlapping groups, which are reduced separately (possibly in parallel).
+    If a group can not be reduced, it is reduced again without each of its moduli in turn, so a group can contain at most one modulus which does not share the bits.
+    Moduli which are factored are removed before the remaining moduli are partitioned again, unrelated moduli are not factored.
+    :param N: the moduli
+    :param n: the bit length of the moduli
+    :param t: the number of shared most significant bits
+    :param group_size: the number of moduli in a group (default: 16)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :return: a list containing a tuple of the factors of each modulus, or None for moduli which could not be factored
+    """
+    return _factorize_batch(N, n, t, False, group_size, workers)
+
+
+def factorize_lsb_batch(N, n, t, group_size=16, workers=1):
+    """
+    Factorizes many moduli when some least significant bits are equal among multiples of a prime factor.
+    The moduli are partitioned into overlapping groups, which are reduced separately (possibly in parallel).
+    If a group can not be reduced, it is reduced again without each of its moduli in turn, so a group can contain at most one modulus which does not share the bits.
+    Moduli which are factored are removed before the remaining moduli are partitioned again, unrelated moduli are not factored.
+    :param N: the moduli
+    :param n: the bit length of the moduli
+    :param t: the number of shared least significant bits
+    :param group_size: the number of moduli in a group (default: 16)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :return: a list containing a tuple of the factors of each modulus, or None for moduli which could not be factored
+    """
+    return _factorize_batch(N, n, t, True, group_size, workers)
@@ -1,87 +1,263 @@
 import logging
 import os
 import sys
+from math import lcm
 from math import log2
 
+from sage.all import ZZ
 from sage.all import Zmod
+from sage.all import binomial
 from sage.all import factor
+from sage.all import matrix
+from sage.all import primes_first_n
+from sage.all import prod
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
-from shared.small_roots import howgrave_graham
+from shared import cache
+from shared import small_roots
+from shared.parallel import parallel_first
+from shared.parallel import split_range
 
 
-def _prime_power_divisors(M):
-    divisors = []
-    for p, e in factor(M):
-        for i in range(1, e + 1):
-            divisors.append(p ** i)
+_orders = {}
 
-    divisors.sort()
-    return divisors
+
+# Returns a list of tuples containing the prime p, the prime power p^i, and the order of 65537 mod p^i, for every prime power divisor of M.
+def _get_orders(M):
+    if M not in _orders:
+        orders = []
+        for p, e in factor(M):
+            for i in range(1, e + 1):
+                orders.append((int(p), int(p ** i), int(Zmod(p ** i)(65537).multiplicative_order())))
+
+        orders.sort(key=lambda x: x[1])
+        _orders[M] = orders
+
+    return _orders[M]
+
+
+def _compute_max_M_(orders, ord_):
+    M_ = 1
+    for p, _, ordp in orders:
+        if ord_ % ordp == 0:
+            M_ *= p
+
+    return M_
 
 
 # Algorithm 2.
 def compute_max_M_(M, ord_):
-    for p in _prime_power_divisors(M):
-        ordp = Zmod(p)(65537).multiplicative_order()
-        if ord_ % ordp != 0:
-            M //= p
-
-    return M
+    return _compute_max_M_(_get_orders(M), ord_)
 
 
 # Section 2.7.2.
 def _greedy_find_M_(n, M):
-    ord = Zmod(M)(65537).multiplicative_order()
+    # The orders mod the prime power divisors of M and the factorization of ord are only computed once.
+    orders = _get_orders(M)
+    ord = lcm(*[ordp for _, _, ordp in orders])
+    ord_factors = {int(p): int(e) for p, e in factor(ord)}
     while True:
         best_r = 0
         best_ord_ = ord
         best_M_ = M
-        for p in _prime_power_divisors(ord):
-            ord_ = ord // p
-            M_ = compute_max_M_(M, ord_)
+        best_divisor = None
+        for p, i in sorted(((p, i) for p, e in ord_factors.items() for i in range(1, e + 1)), key=lambda x: x[0] ** x[1]):
+            ord_ = ord // p ** i
+            M_ = _compute_max_M_(orders, ord_)
             r = (log2(ord) - log2(ord_)) / (log2(M) - log2(M_))
             if r > best_r:
                 best_r = r
                 best_ord_ = ord_
                 best_M_ = M_
+                best_divisor = p, i
 
         if log2(best_M_) < log2(n) / 4:
             return M
 
+        if best_divisor is None:
+            # No divisor of ord reduces M' any further.
+            return M
+
         ord = best_ord_
         M = best_M_
+        p, i = best_divisor
+        ord_factors[p] -= i
+        if ord_factors[p] == 0:
+            del ord_factors[p]
+
+
+def get_M_(bit_length, M=None, cache_dir=None):
+    """
+    Returns M' for a modulus bit length, generated from M using the greedy heuristic.
+    The results are cached (and optionally persisted to disk), so M' only has to be generated once for every bit length (e.g. 512, 1024, 2048, 4096).
+    :param bit_length: the bit length of the modulus
+    :param M: the primorial used to generate the primes (default: the primorial for the bit length)
+    :param cache_dir: the directory to persist M' in, e.g. cache.CACHE_DIR (default: None, M' is only cached in memory)
+    :return: M'
+    """
+    if M is None:
+        M, _, _ = get_parameters(bit_length)
+
+    # Using 2^bit_length as the modulus ensures M' is large enough for every modulus with this bit length.
+    return cache.get("roca", f"{bit_length}:{int(M):x}", lambda: int(_greedy_find_M_(2 ** bit_length, M)), cache_dir)
 
 
-def factorize(N, M, m, t, g=65537):
+# Section 2.5 and Table 1: the minimum modulus bit length, the number of primes in M, and the recommended m and t.
+_PARAMETERS = [
+    (3968, 225, 7, 8),
+    (3072, 126, 25, 26),
+    (1984, 126, 6, 7),
+    (992, 71, 4, 5),
+    (0, 39, 5, 6),
+]
+
+_residue_tables = {}
+
+
+def get_parameters(bit_length):
+    """
+    Returns the primorial M and the recommended m and t parameters for a modulus bit length.
+    More information: Nemec M. et al., "The Return of Coppersmith’s Attack: Practical Factorization of Widely Used RSA Moduli" (Table 1)
+    :param bit_length: the bit length of the modulus
+    :return: a tuple containing M, m, and t
+    """
+    for min_bit_length, primes, m, t in _PARAMETERS:
+        if bit_length >= min_bit_length:
+            return int(prod(primes_first_n(primes))), m, t
+
+
+# Returns a list of tuples containing the prime divisors p of M and a bit mask of the subgroup generated by g mod p.
+def _get_residue_table(M, g):
+    if (M, g) not in _residue_tables:
+        table = []
+        for p, _ in factor(M):
+            p = int(p)
+            mask = 0
+            x = 1
+            while not (mask >> x) & 1:
+                mask |= 1 << x
+                x = x * g % p
+            table.append((p, mask))
+
+        _residue_tables[M, g] = table
+
+    return _residue_tables[M, g]
+
+
+def fingerprint(N, M=None, g=65537):
+    """
+    Checks whether a modulus has the structure of a modulus generated using the ROCA method.
+    This is the case if N mod p is in the subgroup generated by g mod p for every prime divisor p of M.
+    More information: Nemec M. et al., "The Return of Coppersmith’s Attack: Practical Factorization of Widely Used RSA Moduli" (Section 2.4)
+    :param N: the modulus
+    :param M: the primorial used to generate the primes (default: the primorial for the bit length of N)
+    :param g: the generator value (default: 65537)
+    :return: True if the modulus might be vulnerable, False otherwise
+    """
+    if M is None:
+        M, _, _ = get_parameters(int(N).bit_length())
+
+    for p, mask in _get_residue_table(M, g):
+        if not (mask >> (N % p)) & 1:
+            return False
+
+    return True
+
+
+def scan(moduli, g=65537, cache_dir=None):
+    """
+    Scans many moduli for the ROCA fingerprint.
+    The residue tables and M' are only computed once for every bit length, so this can be used for large amounts of moduli.
+    :param moduli: an iterable of moduli
+    :param g: the generator value (default: 65537)
+    :param cache_dir: the directory to persist M' in, e.g. cache.CACHE_DIR (default: None, M' is only cached in memory)
+    :return: a generator generating tuples containing a vulnerable modulus, and the recommended M', m, and t parameters for factorize (M' can be passed as M_)
+    """
+    for N in moduli:
+        bit_length = int(N).bit_length()
+        M, m, t = get_parameters(bit_length)
+        if fingerprint(N, M, g):
+            yield N, get_M_(bit_length, M, cache_dir), m, t
+
+
+# Creates a template for the Howgrave-Graham lattice of f(x) = x + a mod N (delta = 1, see howgrave_graham.modular_univariate).
+# Every entry is represented as a tuple (column, coefficient, exponent), the lattice entry is then coefficient * a^exponent.
+def _create_lattice_template(N, m, t, X):
+    rows = []
+    for i in range(m):
+        # g = N^(m - i) * f^i
+        rows.append([(l, N ** (m - i) * binomial(i, l) * X ** l, i - l) for l in range(i + 1)])
+
+    for i in range(t):
+        # h = x^i * f^m
+        rows.append([(i + l, binomial(m, l) * X ** (i + l), m - l) for l in range(m + 1)])
+
+    return rows
+
+
+def _fill_lattice_template(template, a, m):
+    powers = [a ** i for i in range(m + 1)]
+    L = matrix(ZZ, len(template), len(template))
+    for row, entries in enumerate(template):
+        for col, coefficient, exponent in entries:
+            L[row, col] = coefficient * powers[exponent]
+
+    return L
+
+
+def _factorize_range(N, M_, g, m, t, X, start, stop):
+    pr = ZZ["x"]
+    x = pr.gen()
+    monomials = [x ** l for l in range(m + t)]
+    template = _create_lattice_template(N, m, t, X)
+    M_inv = pow(M_, -1, N)
+    ga_ = pow(g, start, M_)
+    for a_ in range(start, stop):
+        # f = M' * x + g^a' mod N, made monic.
+        a = ga_ * M_inv % N
+        f = x + a
+        L = _fill_lattice_template(template, a, m)
+        L = small_roots.reduce_lattice(L)
+        polynomials = small_roots.reconstruct_polynomials(L, f, N ** m, monomials, [X])
+        for roots in small_roots.find_roots(pr, polynomials):
+            p = int(M_ * roots[x] + ga_)
+            if 1 < p < N and N % p == 0:
+                return p, N // p
+
+        ga_ = ga_ * g % M_
+
+    return None
+
+
+def factorize(N, M, m, t, g=65537, workers=1, M_=None, cache_dir=None):
     """
     Recovers the prime factors from a modulus using the ROCA method.
+    The lattice structure is the same for every a', so it is only created once and filled in for every a'.
     More information: Nemec M. et al., "The Return of Coppersmith’s Attack: Practical Factorization of Widely Used RSA Moduli"
     :param N: the modulus
     :param M: the primorial used to generate the primes
     :param m: the m parameter for Coppersmith's method
     :param t: the t parameter for Coppersmith's method
     :param g: the generator value (default: 65537)
+    :param workers: the number of worker processes to search a' (default: 1, None means the number of CPUs)
+    :param M_: the M' to use, for example from scan (default: generated from M using get_M_)
+    :param cache_dir: the directory to persist a generated M' in, e.g. cache.CACHE_DIR (default: None, M' is only cached in memory)
     :return: a tuple containing the prime factors, or None if the factors were not found
     """
-    logging.info("Generating M'...")
-    M_ = _greedy_find_M_(N, M)
+    if M_ is None:
+        logging.info("Generating M'...")
+        M_ = get_M_(int(N).bit_length(), M, cache_dir)
+
     zmodm_ = Zmod(M_)
-    g = zmodm_(g)
-    c_ = zmodm_(N).log(g)
-    ord_ = g.multiplicative_order()
+    g_ = zmodm_(g)
+    c_ = int(zmodm_(N).log(g_))
+    ord_ = int(g_.multiplicative_order())
 
-    x = Zmod(N)["x"].gen()
     X = int(2 * N ** 0.5 // M_)
     logging.info("Starting exhaustive a' search...")
-    for a_ in range(c_ // 2, (c_ + ord_) // 2 + 1):
-        f = M_ * x + int(g ** a_)
-        for k_, in howgrave_graham.modular_univariate(f, N, m, t, X):
-            p = int(f(k_))
-            if N % p == 0:
-                return p, N // p
-
-    return None
+    args = [(N, int(M_), g, m, t, X, start, stop) for start, stop in split_range(c_ // 2, (c_ + ord_) // 2 + 1, 100)]
+    result = parallel_first(_factorize_range, args, workers, progress=True)
+    return None if result is None else result[1]
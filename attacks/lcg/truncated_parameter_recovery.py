@@ -39,6 +39,8 @@ def _generate_polynomials(y, n, t):
 
 # Section 4 in "On Stern's Attack Against Secret Truncated Linear Congruential Generators".
 def _recover_modulus_and_multiplier(polynomials, m=None, a=None, check_modulus=None):
+    # The same pairs of polynomials occur in many combinations, so the gcds modulo the prime factors are reused.
+    cache = {}
     for comb in combinations(polynomials, 3):
         P0 = comb[0]
         P1 = comb[1]
@@ -47,7 +49,7 @@ def _recover_modulus_and_multiplier(polynomials, m=None, a=None, check_modulus=N
         if (m is None and check_modulus(m_)) or m_ == m:
             if a is None:
                 factors = factor(m_)
-                g = polynomial_gcd_crt(P0, polynomial_gcd_crt(P1, P2, factors), factors)
+                g = polynomial_gcd_crt(P0, polynomial_gcd_crt(P1, P2, factors, cache=cache), factors, cache=cache)
                 for a_ in g.change_ring(Zmod(m_)).roots(multiplicities=False):
                     yield int(m_), int(a_)
             else:
@@ -1,14 +1,94 @@
 import logging
+import os
+import sys
 
-from sage.all import GF
-from sage.all import ZZ
 from sage.all import factor
-from sage.all import matrix
 from sage.all import next_prime
-from sage.all import vector
 
+path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
+if sys.path[1] != path:
+    sys.path.insert(1, path)
 
-def attack(hash_oracle, sign_oracle, N, e, target_m):
+from shared import product_tree
+from shared import remainder_tree
+from shared.parallel import parallel_mapper
+
+
+# Reduces the sparse row v (a dict) modulo e using the pivot rows, in the order in which they were inserted.
+# The combination comb (a dict) of relations is updated to keep track of the subtracted pivot rows.
+def _reduce(pivots, e, v, comb):
+    for c, row, row_comb in pivots:
+        f = v.get(c, 0)
+        if f == 0:
+            continue
+
+        for j, x in row.items():
+            y = (v.get(j, 0) - f * x) % e
+            if y == 0:
+                v.pop(j, None)
+            else:
+                v[j] = y
+
+        for j, x in row_comb.items():
+            comb[j] = (comb.get(j, 0) - f * x) % e
+
+
+# Inserts the relation with index i into the incremental row echelon form, returns True if the rank increased.
+# Every pivot row is zero in the pivot columns of the rows which were inserted before it.
+def _insert(pivots, e, v, i):
+    v = {j: x % e for j, x in v.items() if x % e != 0}
+    comb = {i: 1}
+    _reduce(pivots, e, v, comb)
+    if not v:
+        return False
+
+    c = min(v)
+    inv = pow(v[c], -1, e)
+    pivots.append((c, {j: x * inv % e for j, x in v.items()}, {j: x * inv % e for j, x in comb.items() if x != 0}))
+    return True
+
+
+# Computes b such that the linear combination of the relations with coefficients b is v (mod e).
+def _solve(pivots, e, v):
+    v = {j: x % e for j, x in v.items() if x % e != 0}
+    comb = {}
+    _reduce(pivots, e, v, comb)
+    assert not v, "Target vector is not in the span of the relations"
+    # v - sum(comb[j] * relation j) = 0.
+    return {j: -x % e for j, x in comb.items() if x % e != 0}
+
+
+# Generates the messages with a B-smooth hash and the factors of the hash, P is the product of all primes <= B.
+# x is B-smooth if and only if P^(2^k) = 0 mod x, with 2^k >= log2(x), so the hashes are tested in batches using a remainder tree.
+# needed() returns the number of relations which are still needed, which is used to estimate how many hashes the next batch requires.
+def _smooth_relations(hash_oracle, P, workers, batch_size, needed):
+    tested = 0
+    found = 0
+    # The same worker processes are used for every batch.
+    with parallel_mapper(workers) as map_:
+        mi = 0
+        while True:
+            # Based on the fraction of smooth hashes so far, the last batch only contains as many hashes as are needed for the remaining relations.
+            size = batch_size if found == 0 else max(1, min(batch_size, (needed() * tested + found - 1) // found))
+            ms = range(mi, mi + size)
+            hs = [int(h) for h in map_(hash_oracle, [(m,) for m in ms])]
+            candidates = [(m, h) for m, h in zip(ms, hs) if h > 0]
+            rs = remainder_tree(P, product_tree([h for _, h in candidates])) if candidates else []
+            tested += size
+            for (m, h), r in zip(candidates, rs):
+                k = 1
+                while r != 0 and k < h.bit_length():
+                    r = r * r % h
+                    k *= 2
+
+                if r == 0:
+                    found += 1
+                    yield m, factor(h)
+
+            mi += size
+
+
+def attack(hash_oracle, sign_oracle, N, e, target_m, workers=1, batch_size=4096):
     """
     Performs a selective forgery attack using the Desmedt-Odlyzko attack.
     Note that this selective forgery attack is much slower than the existential forgery attack. However, it is also more applicable to real world scenarios.
@@ -18,6 +98,8 @@ def attack(hash_oracle, sign_oracle, N, e, target_m):
     :param N: the modulus
     :param e: the public exponent
     :param target_m: the target message to sign (integer)
+    :param workers: the number of worker processes to call the hash oracle, which should be picklable if this is not 1 (default: 1, None means the number of CPUs)
+    :param batch_size: the maximum number of hashes which are tested for smoothness at once (default: 4096)
     :return: the signature of the target message (integer)
     """
     target_factors = factor(hash_oracle(target_m))
@@ -34,59 +116,42 @@ def attack(hash_oracle, sign_oracle, N, e, target_m):
 
     l = len(primes)
 
-    Vt = vector(GF(e), l, sparse=True)
-    for p, v in target_factors:
-        Vt[primes[p]] = v
+    Vt = {primes[p]: int(v) for p, v in target_factors}
 
-    logging.info(f"Generating initial {l}x{l} matrix...")
-    M = matrix(GF(e), l, sparse=True)
+    # The relations are inserted into a sparse row echelon form (mod e), which is only extended if the rank increases.
+    logging.info(f"Generating {l}x{l} basis matrix...")
+    pivots = []
+    relations = []
     m = []
-    mi = 0
-    i = 0
-    while i < l:
-        factors = factor(hash_oracle(mi))
-        if all(p <= B for p, _ in factors):
-            for p, v in factors:
-                M[i, primes[p]] = v
+    P = product_tree([int(p) for p in primes])[-1][0]
+    for mi, factors in _smooth_relations(hash_oracle, P, workers, batch_size, lambda: l - len(pivots)):
+        Vi = {primes[p]: int(v) for p, v in factors}
+        if _insert(pivots, e, Vi, len(relations)):
+            relations.append(Vi)
             m.append(mi)
-            i += 1
-        mi += 1
-
-    rank = M.rank()
-    logging.info(f"Extending initial matrix with rank {rank} (required = {l})...")
-    while rank < l:
-        Vi = vector(GF(e), l, sparse=True)
-        factors = factor(hash_oracle(mi))
-        if all(p <= B for p, _ in factors):
-            for p, v in factors:
-                Vi[primes[p]] = v
-            M_ = M.stack(Vi)
-            rank_ = M_.rank()
-            if rank_ > rank:
-                M = M_
-                rank = rank_
-                m.append(mi)
-                logging.debug(f"New rank: {rank}...")
-        mi += 1
-
-    logging.info(f"Found {M.nrows()}x{M.ncols()} basis matrix")
-
-    b = M.solve_left(Vt)
+            logging.debug(f"New rank: {len(pivots)}...")
+            if len(pivots) == l:
+                break
+
+    logging.info(f"Found {len(relations)}x{l} basis matrix")
+
+    b = _solve(pivots, e, Vt)
 
     logging.info(f"Found linear combination of target vector")
 
-    Vt = Vt.change_ring(ZZ)
-    M = M.change_ring(ZZ)
-    b = b.change_ring(ZZ)
-    G = (Vt - b * M) / e
+    # Vt - b * M is divisible by e.
+    G = [Vt.get(j, 0) for j in range(l)]
+    for i, bi in b.items():
+        for j, v in relations[i].items():
+            G[j] -= bi * v
+
     delta = 1
     for pj, gj in zip(primes.keys(), G):
-        delta = delta * pow(int(pj), int(gj), N) % N
+        delta = delta * pow(int(pj), gj // e, N) % N
 
     st = delta
-    for bi, mi in zip(b, m):
-        if bi > 0:
-            si = sign_oracle(mi)
-            st = st * pow(int(si), int(bi), N) % N
+    for i, bi in b.items():
+        si = sign_oracle(m[i])
+        st = st * pow(int(si), bi, N) % N
 
     return st
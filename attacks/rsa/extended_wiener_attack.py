@@ -10,9 +10,55 @@ if sys.path[1] != path:
     sys.path.insert(1, path)
 
 from attacks.factorization import known_phi
+from shared.parallel import parallel_first
+from shared.parallel import split_range
 
 
-def attack(n, e, max_s=20000, max_r=100, max_t=100):
+def _check(n, e, k, d):
+    phi = (e * d - 1) // k
+    factors = known_phi.factorize(n, phi)
+    if factors:
+        return *factors, int(d)
+
+    return None
+
+
+def _attack_range(n, e, k1, d1, k2, d2, max_r, max_t, start, stop):
+    # Consecutive values of d differ by d1, so 2^(e * d) mod n can be updated with a single multiplication.
+    x = pow(2, e, n)
+    x_d1 = pow(x, d1, n)
+    x_d1_inv = pow(x_d1, -1, n)
+    x_d2 = pow(x, d2, n)
+    x_sd1 = pow(x_d1, start, n)
+    x_sd2 = pow(x_d2, start, n)
+    for s in range(start, stop):
+        y = x_sd1
+        for r in range(max_r):
+            if y == 2:
+                k = r * k1 + s * k1
+                d = r * d1 + s * d1
+                if k != 0 and (factors := _check(n, e, k, d)):
+                    return factors
+
+            y = y * x_d1 % n
+
+        y = x_sd2
+        for t in range(max_t):
+            if y == 2:
+                k = s * k2 - t * k1
+                d = s * d2 - t * d1
+                if k != 0 and (factors := _check(n, e, k, d)):
+                    return factors
+
+            y = y * x_d1_inv % n
+
+        x_sd1 = x_sd1 * x_d1 % n
+        x_sd2 = x_sd2 * x_d2 % n
+
+    return None
+
+
+def attack(n, e, max_s=20000, max_r=100, max_t=100, workers=1):
     """
     Recovers the prime factors if the private exponent is too small.
     More information: Dujella A., "Continued fractions and RSA with small secret exponent"
@@ -21,6 +67,7 @@ def attack(n, e, max_s=20000, max_r=100, max_t=100):
     :param max_s: the amount of s values to try (default: 20000)
     :param max_r: the amount of r values to try for each s value (default: 100)
     :param max_t: the amount of t values to try for each s value (default: 100)
+    :param workers: the number of worker processes to try s values in parallel (default: 1, None means the number of CPUs)
     :return: a tuple containing the prime factors and the private exponent, or None if the private exponent was not found
     """
     i_n = ZZ(n)
@@ -34,25 +81,11 @@ def attack(n, e, max_s=20000, max_r=100, max_t=100):
     else:
         return None
 
-    for s in range(max_s):
-        for r in range(max_r):
-            k = r * convergents[m + 1].numerator() + s * convergents[m + 1].numerator()
-            d = r * convergents[m + 1].denominator() + s * convergents[m + 1].denominator()
-            if pow(pow(2, e, n), d, n) != 2:
-                continue
-
-            phi = (e * d - 1) // k
-            factors = known_phi.factorize(n, phi)
-            if factors:
-                return *factors, int(d)
-
-        for t in range(max_t):
-            k = s * convergents[m + 2].numerator() - t * convergents[m + 1].numerator()
-            d = s * convergents[m + 2].denominator() - t * convergents[m + 1].denominator()
-            if pow(pow(2, e, n), d, n) != 2:
-                continue
-
-            phi = (e * d - 1) // k
-            factors = known_phi.factorize(n, phi)
-            if factors:
-                return *factors, int(d)
+    n = int(n)
+    e = int(e)
+    k1 = int(convergents[m + 1].numerator())
+    d1 = int(convergents[m + 1].denominator())
+    k2 = int(convergents[m + 2].numerator())
+    d2 = int(convergents[m + 2].denominator())
+    result = parallel_first(_attack_range, [(n, e, k1, d1, k2, d2, max_r, max_t, start, stop) for start, stop in split_range(0, max_s, workers)], workers)
+    return None if result is None else result[1]
@@ -7,7 +7,7 @@ if sys.path[1] != path:
     sys.path.insert(1, path)
 
 from attacks.rsa import low_exponent
-from shared.crt import fast_crt
+from shared.crt import CRTContext
 
 
 def attack(N, e, c):
@@ -25,5 +25,5 @@ def attack(N, e, c):
             if i != j and gcd(N[i], N[j]) != 1:
                 raise ValueError(f"Modulus {i} and {j} share factors, Hastad's attack is impossible.")
 
-    c, _ = fast_crt(c, N)
+    c = CRTContext(N).combine(c)
     return low_exponent.attack(e, c)
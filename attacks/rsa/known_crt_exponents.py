@@ -7,29 +7,97 @@ from math import log
 
 from sage.all import Zmod
 from sage.all import is_prime
+from sage.all import prime_range
+from sage.all import prod
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
 from shared import ceil_div
+from shared.parallel import parallel_imap
 from shared.small_roots import herrmann_may
 from shared.small_roots import howgrave_graham
 
 
-def _get_possible_primes(e, d):
-    logging.debug(f"Looking for possible primes for {e = }, {d = }")
-    mul = e * d - 1
-    for k in range(3, e):
-        if mul % k == 0:
+# The product of the odd primes below 1000, used to discard most composite candidates before the primality test.
+_SIEVE_BOUND = 1000
+_SIEVE = prod(prime_range(3, _SIEVE_BOUND))
+
+
+# Returns the factorization of e * d - 1 restricted to prime powers below stop, for every e in range(start, stop, 2).
+# e * d - 1 = 0 mod p^a if and only if e = d^-1 mod p^a, so the matching e values form an arithmetic progression.
+def _factor_smooth_parts(start, stop, d):
+    count = len(range(start, stop, 2))
+    factors = [[] for _ in range(count)]
+    for p in prime_range(3, stop):
+        p = int(p)
+        if d % p == 0:
+            continue
+
+        pa = p
+        while pa < stop:
+            first = (pow(d, -1, pa) - start) * pow(2, -1, pa) % pa
+            for j in range(first, count, pa):
+                if pa == p:
+                    factors[j].append([p, 1])
+                else:
+                    factors[j][-1][1] += 1
+
+            pa *= p
+
+    max_a = (stop - 1).bit_length() - 1
+    for j, e in enumerate(range(start, stop, 2)):
+        mul = e * d - 1
+        if mul > 0 and (a := min((mul & -mul).bit_length() - 1, max_a)) > 0:
+            factors[j].append([2, a])
+
+    return factors
+
+
+def _get_divisors(factors, bound):
+    divisors = [1]
+    for p, a in factors:
+        divisors = [k * p ** i for k in divisors for i in range(a + 1) if k * p ** i < bound]
+
+    return sorted(divisors)
+
+
+def _get_possible_primes(start, stop, d, bit_length):
+    logging.debug(f"Looking for possible primes for e in [{start}, {stop}), {d = }")
+    possible_primes = []
+    for e, factors in zip(range(start, stop, 2), _factor_smooth_parts(start, stop, d)):
+        mul = e * d - 1
+        primes = []
+        # k(p - 1) = e * d - 1 with k < e, so only the divisors below e have to be considered.
+        for k in _get_divisors(factors, e):
+            if k < 3:
+                continue
+
             p = (mul // k) + 1
+            if bit_length is not None and p.bit_length() != bit_length:
+                continue
+            if p > _SIEVE_BOUND and (p % 2 == 0 or gcd(p, _SIEVE) != 1):
+                continue
             if is_prime(p):
-                yield p
+                primes.append(p)
+
+        possible_primes.append(primes)
+
+    return possible_primes
+
 
+def _get_possible_primes_batch(start, stop, dp, dq, p_bit_length, q_bit_length):
+    count = len(range(start, stop, 2))
+    ps = [[]] * count if dp is None else _get_possible_primes(start, stop, dp, p_bit_length)
+    qs = [[]] * count if dq is None else _get_possible_primes(start, stop, dq, q_bit_length)
+    return list(zip(ps, qs))
 
-def attack(e_start, e_end, N=None, dp=None, dq=None, p_bit_length=None, q_bit_length=None):
+
+def attack(e_start, e_end, N=None, dp=None, dq=None, p_bit_length=None, q_bit_length=None, workers=1, batch_size=4096):
     """
     Generates possible prime factors for a modulus, if d_p and/or d_q are known.
+    The exponents are processed in batches, which can be split across worker processes.
     More information: Campagna M., Sethi A., "Key Recovery Method for CRT Implementation of RSA"
     :param e_start: the start value of the public exponent (inclusive)
     :param e_end: the end value of the public exponent (exclusive)
@@ -38,41 +106,35 @@ def attack(e_start, e_end, N=None, dp=None, dq=None, p_bit_length=None, q_bit_le
     :param dq: the d exponent for q, will be used to generate possible factors for q if not None (default: None)
     :param p_bit_length: the bit length of p, will be used to check possible factors for p if not None (default: None)
     :param q_bit_length: the bit length of q, will be used to check possible factors for q if not None (default: None)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param batch_size: the number of exponents in a batch (default: 4096)
     :return: a generator generating tuples containing possible prime factors
     """
     assert not (dp is None and dq is None), "At least one of the CRT private exponents should be known."
 
-    if dp is not None and dq is not None:
-        for e in range(e_start, e_end, 2):
-            for p in _get_possible_primes(e, dp):
-                for q in _get_possible_primes(e, dq):
-                    if (N is None or p * q == N) and (p_bit_length is None or p.bit_length() == p_bit_length) and (q_bit_length is None or q.bit_length() == q_bit_length):
-                        yield p, q
-
-        return None
-
-    if dp is not None:
-        for e in range(e_start, e_end, 2):
-            for p in _get_possible_primes(e, dp):
-                if p_bit_length is None or p.bit_length() == p_bit_length:
+    dp = None if dp is None else int(dp)
+    dq = None if dq is None else int(dq)
+    args = ((start, min(start + 2 * batch_size, e_end), dp, dq, p_bit_length, q_bit_length) for start in range(e_start, e_end, 2 * batch_size))
+    for batch in parallel_imap(_get_possible_primes_batch, args, workers):
+        for ps, qs in batch:
+            if dp is not None and dq is not None:
+                for p in ps:
+                    for q in qs:
+                        if N is None or p * q == N:
+                            yield p, q
+            elif dp is not None:
+                for p in ps:
                     if N is None:
                         yield p
                     elif N % p == 0:
                         yield p, N // p
-
-        return None
-
-    if dq is not None:
-        for e in range(e_start, e_end, 2):
-            for q in _get_possible_primes(e, dq):
-                if q_bit_length is None or q.bit_length() == q_bit_length:
+            else:
+                for q in qs:
                     if N is None:
                         yield q
                     elif N % q == 0:
                         yield q, N // q
 
-        return None
-
 
 def _factor_msb(N, e, dpM, dp_unknown_lsb, k, m, t):
     logging.info(f"Trying {k = }")
@@ -4,7 +4,6 @@ import sys
 from math import gcd
 
 from sage.all import GF
-from sage.all import crt
 from sage.all import is_prime
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
@@ -12,10 +11,32 @@ if sys.path[1] != path:
     sys.path.insert(1, path)
 
 from attacks.factorization import known_phi
+from shared import roots_of_unity
 from shared import rth_roots
 
 
-def attack(N, e, phi, c):
+# Returns x, z, and k such that the e-th roots of c mod p, multiplied by u, are x * z^i mod N for 0 <= i < k.
+# If u = 1 mod p and u = 0 mod the other prime, these are the CRT combinations of the roots with 0 mod the other prime.
+def _lifted_roots(N, p, c, e, t, u):
+    if t == 0:
+        return pow(c, pow(e, -1, p - 1), p) * u % N, 1, 1
+
+    Fp = GF(p)
+    root = int(next(rth_roots(Fp, c, e, cache=True)))
+    unity = roots_of_unity(Fp, p - 1, e)
+    next(unity)
+    zeta = next(unity)
+    # z = zeta mod p and z = 1 mod the other prime.
+    return root * u % N, (1 + (zeta - 1) * u) % N, e
+
+
+def _geometric(x, z, k, N):
+    for _ in range(k):
+        yield x
+        x = x * z % N
+
+
+def attack(N, e, phi, c, predicate=None):
     """
     Computes possible plaintexts when e is not coprime with Euler's totient.
     More information: Shumow D., "Incorrectly Generated RSA Keys: How To Recover Lost Plaintexts"
@@ -23,6 +44,7 @@ def attack(N, e, phi, c):
     :param e: the public exponent
     :param phi: Euler's totient for the modulus
     :param c: the ciphertext
+    :param predicate: a function which checks whether a possible plaintext should be generated, e.g. for a known prefix or padding (default: None, all possible plaintexts are generated)
     :return: a generator generating possible plaintexts for c
     """
     assert phi % e == 0, "Public exponent must divide Euler's totient"
@@ -43,7 +65,8 @@ def attack(N, e, phi, c):
         for i in range(e):
             x = a * l % N
             l = l * gE % N
-            yield x
+            if predicate is None or predicate(x):
+                yield x
     else:
         # Fall back to more generic root finding using Adleman-Manders-Miller and CRT.
         p, q = known_phi.factorize(N, phi)
@@ -57,11 +80,18 @@ def attack(N, e, phi, c):
         assert tp > 0 or tq > 0
         cp = c % p
         cq = c % q
+        # up = 1 mod p and up = 0 mod q, uq = 0 mod p and uq = 1 mod q, so every CRT combination is a single addition mod N.
+        up = q * pow(q, -1, p) % N
+        uq = p * pow(p, -1, q) % N
         logging.info(f"Computing {e}-th roots mod {p}...")
-        mps = [pow(cp, pow(e, -1, p - 1), p)] if tp == 0 else list(rth_roots(GF(p), cp, e))
+        xp, zp, kp = _lifted_roots(N, p, cp, e, tp, up)
         logging.info(f"Computing {e}-th roots mod {q}...")
-        mqs = [pow(cq, pow(e, -1, q - 1), q)] if tq == 0 else list(rth_roots(GF(q), cq, e))
-        logging.info(f"Computing {len(mps) * len(mqs)} roots using CRT...")
-        for mp in mps:
-            for mq in mqs:
-                yield int(crt([mp, mq], [p, q]))
+        xq, zq, kq = _lifted_roots(N, q, cq, e, tq, uq)
+        logging.info(f"Computing {kp * kq} roots using CRT...")
+        for mp in _geometric(xp, zp, kp, N):
+            for mq in _geometric(xq, zq, kq, N):
+                m = mp + mq
+                if m >= N:
+                    m -= N
+                if predicate is None or predicate(m):
+                    yield int(m)
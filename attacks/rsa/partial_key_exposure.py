@@ -17,6 +17,8 @@ if sys.path[1] != path:
 
 from attacks.factorization import known_phi
 from shared.hensel import hensel_roots
+from shared.parallel import parallel_first
+from shared.parallel import split_range
 from shared.small_roots import blomer_may
 from shared.small_roots import ernst
 from shared.small_roots import howgrave_graham
@@ -34,45 +36,57 @@ def _bdf_corollary_1(e, f, N, m, t, X):
 def _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length):
     d0 = d1 << (d_bit_length - d1_bit_length)
     k_ = (e * d0 - 1) // N
+    return d0, k_ - 40, k_ + 40
+
+
+# Tries the candidates k in [start, stop) in chunks, which can be split across worker processes.
+def _find_first(f, args, start, stop, workers):
     logging.info("Generating solutions for k candidates...")
-    for k in range(k_ - 40, k_ + 40):
-        yield d0, k
+    result = parallel_first(f, [(*args, start_, stop_) for start_, stop_ in split_range(start, stop, 100)], workers, progress=True)
+    return None if result is None else result[1]
 
 
-def _bdf_3(N, e, d_bit_length, d0, d0_bit_length, r, m, t):
-    n = N.bit_length()
-    logging.info(f"Trying {m = }, {t = }...")
+def _bdf_hensel_range(N, e, d0, d0_bit_length, r, m, t, start, stop):
     p = ZZ["p"].gen()
     x = Zmod(N)["x"].gen()
     X = int(2 * RR(N) ** (1 / 2) / r)  # Equivalent to 2^(n / 2 + 1) / r
-    logging.info("Generating solutions for k candidates...")
-    for k in range(1, e):
+    for k in range(start, stop):
         f = k * p ** 2 + (e * d0 - (1 + k * (N + 1))) * p + k * N
         for p0 in hensel_roots(f, 2, d0_bit_length):
-            f = x * r + p0
-            for p_, q_, d_ in _bdf_corollary_1(e, f, N, m, t, X):
+            g = x * r + p0
+            for p_, q_, d_ in _bdf_corollary_1(e, g, N, m, t, X):
                 return p_, q_, d_
 
     return None
 
 
-def _bdf_4_1(N, e, d_bit_length, d1, d1_bit_length, m, t):
+def _bdf_3(N, e, d_bit_length, d0, d0_bit_length, r, m, t, workers):
     logging.info(f"Trying {m = }, {t = }...")
+    return _find_first(_bdf_hensel_range, (N, e, d0, d0_bit_length, r, m, t), 1, e, workers)
+
+
+def _bdf_4_1_range(N, e, m, t, start, stop):
     p = Zmod(e)["p"].gen()
     x = Zmod(N)["x"].gen()
     X = int(2 * RR(N) ** (1 / 2) / e)  # Equivalent to 2^(n / 2 + 1) / e
-    for _, k in _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length):
+    for k in range(start, stop):
         f = k * p ** 2 - (1 + k * (N + 1)) * p + k * N
         for p0 in f.roots(multiplicities=False):
-            f = x * e + int(p0)
-            for p_, q_, d_ in _bdf_corollary_1(e, f, N, m, t, X):
+            g = x * e + int(p0)
+            for p_, q_, d_ in _bdf_corollary_1(e, g, N, m, t, X):
                 return p_, q_, d_
 
     return None
 
 
-def _bdf_4_2(N, e, d_bit_length, d1, d1_bit_length):
-    for d0, k in _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length):
+def _bdf_4_1(N, e, d_bit_length, d1, d1_bit_length, m, t, workers):
+    logging.info(f"Trying {m = }, {t = }...")
+    _, k_start, k_stop = _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length)
+    return _find_first(_bdf_4_1_range, (N, e, m, t), k_start, k_stop, workers)
+
+
+def _bdf_4_2_range(N, e, d0, start, stop):
+    for k in range(start, stop):
         if gcd(e, k) != 1:
             continue
 
@@ -89,19 +103,15 @@ def _bdf_4_2(N, e, d_bit_length, d1, d1_bit_length):
     return None
 
 
-def _bdf_4_3(N, e, d_bit_length, d0, d0_bit_length, d1, d1_bit_length, r, m, t):
-    logging.info(f"Trying {m = }, {t = }...")
-    p = ZZ["p"].gen()
-    x = Zmod(N)["x"].gen()
-    X = int(2 * RR(N) ** (1 / 2) / r)  # Equivalent to 2^(n / 2 + 1) / r
-    for _, k in _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length):
-        f = k * p ** 2 + (e * d0 - (1 + k * (N + 1))) * p + k * N
-        for p0 in hensel_roots(f, 2, d0_bit_length):
-            f = x * r + p0
-            for p_, q_, d_ in _bdf_corollary_1(e, f, N, m, t, X):
-                return p_, q_, d_
+def _bdf_4_2(N, e, d_bit_length, d1, d1_bit_length, workers):
+    d0, k_start, k_stop = _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length)
+    return _find_first(_bdf_4_2_range, (N, e, d0), k_start, k_stop, workers)
 
-    return None
+
+def _bdf_4_3(N, e, d_bit_length, d0, d0_bit_length, d1, d1_bit_length, r, m, t, workers):
+    logging.info(f"Trying {m = }, {t = }...")
+    _, k_start, k_stop = _bdf_theorem_6(N, e, d_bit_length, d1, d1_bit_length)
+    return _find_first(_bdf_hensel_range, (N, e, d0, d0_bit_length, r, m, t), k_start, k_stop, workers)
 
 
 def _bm_4(N, e, d_bit_length, d1, d1_bit_length, m, t):
@@ -231,7 +241,7 @@ def _ernst_4_3(N, e, d_bit_length, d0, d0_bit_length, M, m, t):
     return None
 
 
-def attack(N, e, partial_d, factor_e=True, m=1, t=None):
+def attack(N, e, partial_d, factor_e=True, m=1, t=None, workers=1):
     """
     Recovers the prime factors of a modulus and the private exponent if part of the private exponent is known.
     More information: Boneh D., Durfee G., Frankel Y., "An Attack on RSA Given a Small Fraction of the Private Key Bits"
@@ -243,6 +253,7 @@ def attack(N, e, partial_d, factor_e=True, m=1, t=None):
     :param factor_e: whether we should attempt to factor e (for BDF) if it is not prime (default: True)
     :param m: the m value to use for the small roots method (default: 1)
     :param t: the t value to use for the small roots method (default: automatically computed using m)
+    :param workers: the number of worker processes to enumerate k candidates for Boneh-Durfee-Frankel (default: 1, None means the number of CPUs)
     :return: a tuple containing the prime factors and the private exponent, or None if the private exponent was not found
     """
     d_bit_length = partial_d.bit_length
@@ -264,7 +275,7 @@ def attack(N, e, partial_d, factor_e=True, m=1, t=None):
         if 1 <= t_ <= n / 2 and d0_bit_length >= n / 4 and d1_bit_length >= t_:
             logging.info("Using Boneh-Durfee-Frankel (Section 4.3)...")
             assert t is not None, "t can not be None for Boneh-Durfee-Frankel small roots."
-            return _bdf_4_3(N, e, d_bit_length, d0, d0_bit_length, d1, d1_bit_length, M, m, t)
+            return _bdf_4_3(N, e, d_bit_length, d0, d0_bit_length, d1, d1_bit_length, M, m, t, workers)
 
         logging.info("No attacks were found to fit the provided parameters (known lsbs and msbs).")
         return None
@@ -288,7 +299,7 @@ def attack(N, e, partial_d, factor_e=True, m=1, t=None):
         if d0_bit_length >= n / 4:
             logging.info("Using Boneh-Durfee-Frankel (Section 3)...")
             assert t is not None, "t can not be None for Boneh-Durfee-Frankel small roots."
-            return _bdf_3(N, e, d_bit_length, d0, d0_bit_length, M, m, t)
+            return _bdf_3(N, e, d_bit_length, d0, d0_bit_length, M, m, t, workers)
 
         logging.info("No attacks were found to fit the provided parameters (known lsbs).")
         return None
@@ -299,11 +310,11 @@ def attack(N, e, partial_d, factor_e=True, m=1, t=None):
         if n / 4 <= t_ <= n / 2 and d1_bit_length >= t_ and (is_prime(e) or factor_e):
             logging.info("Using Boneh-Durfee-Frankel (Section 4.1)...")
             assert t is not None, "t can not be None for Boneh-Durfee-Frankel small roots."
-            return _bdf_4_1(N, e, d_bit_length, d1, d1_bit_length, m, t)
+            return _bdf_4_1(N, e, d_bit_length, d1, d1_bit_length, m, t, workers)
 
         if 0 <= t_ <= n / 2 and d1_bit_length >= n - t_:
             logging.info("Using Boneh-Durfee-Frankel (Section 4.2)...")
-            return _bdf_4_2(N, e, d_bit_length, d1, d1_bit_length)
+            return _bdf_4_2(N, e, d_bit_length, d1, d1_bit_length, workers)
 
         # Blomer-May Section 4 is superseded by Ernst Section 4.2.
         # if 1 / 2 < alpha <= (sqrt(6) - 1) / 2 and delta <= 1 / 8 * (5 - 2 * alpha - sqrt(36 * alpha ** 2 + 12 * alpha - 15)):
@@ -1,7 +1,6 @@
 import logging
 import os
 import sys
-from itertools import product
 
 from sage.all import Zmod
 
@@ -9,6 +8,7 @@ path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
+from shared.parallel import parallel_imap
 from shared.polynomial import fast_polynomial_gcd
 
 
@@ -31,23 +31,52 @@ def attack(N, e, c1, c2, f1, f2):
     return int(g[0])
 
 
-def attack_xor(N, e, c1, c2, x):
+def _attack_xor_range(N, e, c1, c2, x, g1, shifts, start, stop):
+    x_ = g1.parent().gen()
+    ms = []
+    # Bit i of signs determines the sign of shift i.
+    for signs in range(start, stop):
+        difference = sum(shift if (signs >> i) & 1 == 1 else -shift for i, shift in enumerate(shifts))
+        g2 = (x_ + difference) ** e - c2
+        g = fast_polynomial_gcd(g1, g2)
+        if g.degree() != 1:
+            continue
+
+        m = int(-g.monic()[0])
+        if m ^ x == m + difference and pow(m, e, N) == c1:
+            ms.append(m)
+
+    return ms
+
+
+def attack_xor(N, e, c1, c2, x, workers=1, batch_size=64):
     """
     Recovers the shared secret if p1 = p2 ^ x and encrypted with the same modulus and exponent.
     The complexity of this attack is 2^l, with l the hamming weight of x.
+    The sign patterns are processed in batches, which can be split across worker processes.
     :param N: the modulus
     :param e: the public exponent
     :param c1: the ciphertext of the first encryption
     :param c2: the ciphertext of the second encryption
     :param x: the XOR difference
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param batch_size: the number of sign patterns in a batch (default: 64)
     :return: a generator generating possible values of the shared secret
     """
+    N = int(N)
+    e = int(e)
+    c1 = int(c1)
+    c2 = int(c2)
+    x = int(x)
     shifts = []
     for i in range(x.bit_length()):
         if (x >> i) & 1 == 1:
             shifts.append(1 << i)
 
+    # g1 does not depend on the sign pattern, so it is only created once.
+    g1 = Zmod(N)["x"].gen() ** e - c1
     logging.info(f"Brute forcing 2^{len(shifts)} possibilities, this might take some time...")
-    for signs in product([-1, 1], repeat=len(shifts)):
-        difference = sum(sign * shift for sign, shift in zip(signs, shifts))
-        yield attack(N, e, c1, c2, lambda x: x, lambda x: x + difference)
+    count = 1 << len(shifts)
+    args = ((N, e, c1, c2, x, g1, shifts, start, min(start + batch_size, count)) for start in range(0, count, batch_size))
+    for ms in parallel_imap(_attack_xor_range, args, workers):
+        yield from ms
@@ -1,31 +1,94 @@
 import os
 import sys
-
-from sage.all import ZZ
-from sage.all import continued_fraction
+from itertools import islice
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
-from attacks.factorization import known_phi
+from shared import is_square
+from shared.parallel import parallel_imap
+
+
+def _convergents(e, N):
+    # Lazily generates the convergents k / d of the continued fraction expansion of e / N.
+    k_, k = 0, 1
+    d_, d = 1, 0
+    while N != 0:
+        a, r = divmod(e, N)
+        k_, k = k, a * k + k_
+        d_, d = d, a * d + d_
+        yield k, d
+        e, N = N, r
+
+
+def _factorize(N, e, k, d):
+    if k == 0 or (e * d - 1) % k != 0:
+        return None
+
+    phi = (e * d - 1) // k
+    # p and q are the roots of x^2 - s * x + N.
+    s = N - phi + 1
+    if s.bit_length() > N.bit_length() // 2 + 2:
+        return None
+
+    discriminant = s ** 2 - 4 * N
+    if discriminant < 0 or (r := is_square(discriminant)) is None:
+        return None
+
+    p = (s - r) // 2
+    q = (s + r) // 2
+    return (p, q, d) if p > 1 and p * q == N else None
+
+
+def _screen_batch(keys):
+    results = []
+    for i, (N, e) in keys:
+        for k, d in _convergents(e, N):
+            # Wiener bound: d < N^(1/4) / 3, but the attack usually works up to N^(1/4).
+            if d ** 4 > N:
+                break
+
+            if (factors := _factorize(N, e, k, d)) is not None:
+                results.append((i, *factors))
+                break
+
+    return results
 
 
 def attack(N, e):
     """
     Recovers the prime factors of a modulus and the private exponent if the private exponent is too small.
+    This method only works for a modulus consisting of 2 primes, because the primes are recovered from phi as the roots of x^2 - (N - phi + 1) * x + N.
     :param N: the modulus
     :param e: the public exponent
     :return: a tuple containing the prime factors and the private exponent, or None if the private exponent was not found
     """
-    convergents = continued_fraction(ZZ(e) / ZZ(N)).convergents()
-    for c in convergents:
-        k = c.numerator()
-        d = c.denominator()
-        if pow(pow(2, e, N), d, N) != 2:
-            continue
-
-        phi = (e * d - 1) // k
-        factors = known_phi.factorize(N, phi)
-        if factors:
-            return *factors, int(d)
+    N = int(N)
+    e = int(e)
+    for k, d in _convergents(e, N):
+        if (factors := _factorize(N, e, k, d)) is not None:
+            return factors
+
+    return None
+
+
+def attack_many(keys, workers=1, batch_size=1024):
+    """
+    Screens many public keys for private exponents which are too small.
+    The keys are processed lazily in batches, which can be split across worker processes.
+    The continued fraction expansion of every key is stopped at d = N^(1/4), so larger private exponents are not found.
+    Like attack, this method only works for moduli consisting of 2 primes.
+    :param keys: an iterable of tuples containing the modulus and the public exponent
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param batch_size: the number of keys in a batch (default: 1024)
+    :return: a generator generating tuples containing the index of the key, the prime factors, and the private exponent for every vulnerable key
+    """
+    keys = enumerate((int(N), int(e)) for N, e in keys)
+
+    def batches():
+        while batch := list(islice(keys, batch_size)):
+            yield (batch,)
+
+    for results in parallel_imap(_screen_batch, batches(), workers):
+        yield from results
@@ -140,23 +140,48 @@ def roots_of_unity(ring, l, r):
         yield int(g ** i)
 
 
-def rth_roots(Fq, delta, r):
+# Baby-step giant-step tables for rth_roots, by field and r.
+_rth_roots_tables = {}
+
+
+def _bsgs_table(a, n):
+    m = isqrt(n - 1) + 1
+    table = {}
+    x = a.parent()(1)
+    for j in range(m):
+        table.setdefault(x, j)
+        x *= a
+
+    return table, x ** -1, m
+
+
+def _bsgs_log(table, giant, m, d):
+    y = d
+    for i in range(m):
+        j = table.get(y)
+        if j is not None:
+            return i * m + j
+
+        y *= giant
+
+    raise ValueError("No discrete logarithm found")
+
+
+def rth_roots(Fq, delta, r, cache=False):
     """
     Uses the Adleman-Manders-Miller algorithm to extract r-th roots in Fq, with r | q - 1.
+    The discrete logarithms in the subgroup of order r are computed with a baby-step giant-step table, which is built once.
     More information: Cao Z. et al., "Adleman-Manders-Miller Root Extraction Method Revisited" (Table 4)
     :param Fq: the field Fq
     :param delta: the r-th residue delta
     :param r: the r
+    :param cache: whether the r-th non-residue and the baby-step giant-step table should be cached for subsequent calls with the same Fq and r (default: False)
     :return: a generator generating the rth roots
     """
     delta = Fq(delta)
     q = Fq.order()
     assert (q - 1) % r == 0, "r should divide q - 1"
 
-    p = Fq(1)
-    while p ** ((q - 1) // r) == 1:
-        p = Fq.random_element()
-
     t = 0
     s = q - 1
     while s % r == 0:
@@ -168,14 +193,33 @@ def rth_roots(Fq, delta, r):
         k += 1
     alpha = (k * s + 1) // r
 
+    if cache and (Fq, r) in _rth_roots_tables:
+        p, table = _rth_roots_tables[Fq, r]
+    else:
+        p = Fq(1)
+        while p ** ((q - 1) // r) == 1:
+            p = Fq.random_element()
+
+        table = None
+        if cache:
+            _rth_roots_tables[Fq, r] = p, table
+
     a = p ** (pow(r, t - 1, q - 1) * s)
     b = delta ** (r * alpha - 1)
     c = p ** s
     h = 1
     for i in range(1, t):
         d = b ** pow(r, t - 1 - i, q - 1)
-        logging.debug(f"Computing the discrete logarithm for {i = }, this may take a long time...")
-        j = 0 if d == 1 else -d.log(a)
+        j = 0
+        if d != 1:
+            if table is None:
+                logging.debug(f"Building the baby-step giant-step table for the subgroup of order {r}, this may take a long time...")
+                table = _bsgs_table(a, r)
+                if cache:
+                    _rth_roots_tables[Fq, r] = p, table
+
+            j = -_bsgs_log(*table, d)
+
         b *= (c ** r) ** j
         h *= c ** j
         c **= r
@@ -185,6 +229,37 @@ def rth_roots(Fq, delta, r):
         yield root * primitive_root % q
 
 
+def product_tree(X, multiply=lambda x, y: x * y):
+    """
+    Computes the product tree of a list of integers.
+    More information: Bernstein D. J., "How to find smooth parts of integers"
+    :param X: the integers
+    :param multiply: the function to combine two nodes (default: multiplication)
+    :return: a list containing the levels of the tree, starting with the integers and ending with a list containing their product
+    """
+    tree = [list(X)]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append([multiply(level[i], level[i + 1]) if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)])
+
+    return tree
+
+
+def remainder_tree(x, tree):
+    """
+    Computes x modulo every integer in a product tree, using the remainders modulo the products on the higher levels.
+    More information: Bernstein D. J., "How to find smooth parts of integers"
+    :param x: the integer x
+    :param tree: the product tree
+    :return: a list containing x modulo the integers on the lowest level of the tree
+    """
+    r = [x % tree[-1][0]]
+    for level in reversed(tree[:-1]):
+        r = [r[i // 2] % y for i, y in enumerate(level)]
+
+    return r
+
+
 def modinv_range(n, p):
     """
     Computes the modular inverses of the numbers in the range (1, n] (exclusive), mod p.
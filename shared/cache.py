@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+from hashlib import sha256
+
+CACHE_DIR = os.environ.get("CRYPTO_ATTACKS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "crypto-attacks"))
+
+_caches = {}
+
+
+# Every value is stored in a separate file, so processes never overwrite values stored by other processes.
+def _get_path(cache_dir, name, key):
+    return os.path.join(cache_dir, name, f"{sha256(key.encode()).hexdigest()}.json")
+
+
+def _read(cache_dir, name, key):
+    try:
+        with open(_get_path(cache_dir, name, key)) as f:
+            stored_key, value = json.load(f)
+            return stored_key == key, value
+    except (OSError, ValueError, TypeError):
+        return False, None
+
+
+def _write(cache_dir, name, key, value):
+    path = _get_path(cache_dir, name, key)
+    try:
+        # Serialize first, so no file is created if the value can't be serialized.
+        data = json.dumps([key, value])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial file.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, TypeError) as e:
+        logging.warning(f"Unable to store {key} in cache {name} in {cache_dir}: {e}")
+
+
+def get(name, key, compute, cache_dir=None):
+    """
+    Returns a value from a named cache, which is kept in memory and can be persisted to disk.
+    If the value is not cached yet, it is computed and stored.
+    :param name: the name of the cache
+    :param key: the key (a string)
+    :param compute: a function without parameters which computes the value (should be JSON serializable to be persisted)
+    :param cache_dir: the directory to persist the cache in, e.g. CACHE_DIR (default: None, the value is only cached in memory)
+    :return: the value
+    """
+    cache = _caches.setdefault((cache_dir, name), {})
+    if key not in cache:
+        found, value = (False, None) if cache_dir is None else _read(cache_dir, name, key)
+        if not found:
+            value = compute()
+            if cache_dir is not None:
+                _write(cache_dir, name, key, value)
+
+        cache[key] = value
+
+    return cache[key]
@@ -2,9 +2,12 @@ import logging
 
 from sage.all import EllipticCurve
 from sage.all import GF
-from sage.all import hilbert_class_polynomial
+from sage.all import ZZ
+from sage.all import hilbert_class_polynomial as sage_hilbert_class_polynomial
 from sage.all import is_prime_power
 
+from shared import cache
+
 
 def elementary_symmetric_function(x, k):
     assert k > 0
@@ -25,6 +28,20 @@ def elementary_symmetric_function(x, k):
     return e[k - 1]
 
 
+def hilbert_class_polynomial(D, cache_dir=None):
+    """
+    Computes the Hilbert class polynomial H_D(X) given D.
+    The coefficients are cached, so every polynomial only has to be computed once.
+    :param D: the CM discriminant (negative)
+    :param cache_dir: the directory to persist the coefficients in (default: None, the coefficients are only cached in memory)
+    :return: the Hilbert class polynomial (over ZZ)
+    """
+    assert D < 0 and (D % 4 == 0 or D % 4 == 1), "D must be negative and a discriminant"
+    # The coefficients are stored as hexadecimal strings, because large integers can't always be converted to decimal strings.
+    coefficients = cache.get("hilbert_class_polynomials", str(D), lambda: [f"{int(c):x}" for c in sage_hilbert_class_polynomial(D).list()], cache_dir)
+    return ZZ["x"]([int(c, 16) for c in coefficients])
+
+
 def hilbert_class_polynomial_roots(D, gf):
     """
     Computes the roots of H_D(X) mod q given D and GF(q).
@@ -1,6 +1,9 @@
 from sage.all import crt
+from math import gcd
 from math import lcm
 
+from shared import product_tree
+
 
 def fast_crt(X, M, segment_size=8):
     """
@@ -26,3 +29,75 @@ def fast_crt(X, M, segment_size=8):
         M = M_
 
     return X[0], M[0]
+
+
+class CRTContext:
+    """
+    Combines remainders modulo a fixed list of moduli (not necessarily coprime) using the Chinese Remainder Theorem.
+    The product tree of the moduli and the inverses needed to combine two nodes are precomputed, so every combination only costs a multiplication and a reduction per node.
+    """
+
+    def __init__(self, M):
+        """
+        Constructs a new CRTContext for the moduli M.
+        :param M: the moduli (not necessarily coprime)
+        """
+        assert len(M) > 0
+        self.moduli = [int(m) for m in M]
+        # The nodes of the tree are the least common multiples of their children (the products if the moduli are coprime).
+        tree = product_tree(self.moduli, lcm)
+        # Every level contains tuples (m1, g, inv, m2 // g) to combine two nodes of the previous level, or None if a node has no sibling.
+        self._levels = []
+        self.coprime = True
+        for level in tree[:-1]:
+            nodes = []
+            for i in range(0, len(level), 2):
+                if i + 1 == len(level):
+                    nodes.append(None)
+                    continue
+
+                m1 = level[i]
+                m2 = level[i + 1]
+                g = gcd(m1, m2)
+                self.coprime &= g == 1
+                m2_g = m2 // g
+                nodes.append((m1, g, pow(m1 // g, -1, m2_g), m2_g))
+
+            self._levels.append(nodes)
+
+        self.modulus = tree[-1][0]
+
+    def combine(self, X):
+        """
+        Computes the CRT remainder of the remainders X.
+        :param X: the remainders, one for every modulus
+        :return: the remainder modulo the least common multiple of the moduli (raises a ValueError if the remainders are inconsistent)
+        """
+        assert len(X) == len(self.moduli)
+        X = [int(x) % m for x, m in zip(X, self.moduli)]
+        for nodes in self._levels:
+            X_ = []
+            for i, node in enumerate(nodes):
+                if node is None:
+                    X_.append(X[2 * i])
+                    continue
+
+                m1, g, inv, m2_g = node
+                x1 = X[2 * i]
+                d = X[2 * i + 1] - x1
+                if g != 1:
+                    if d % g != 0:
+                        raise ValueError("No solution to crt problem since remainders are inconsistent")
+                    d //= g
+                X_.append(x1 + m1 * (d * inv % m2_g))
+            X = X_
+
+        return X[0]
+
+    def combine_many(self, Xs):
+        """
+        Computes the CRT remainders of many vectors of remainders.
+        :param Xs: the vectors of remainders, every vector contains one remainder for every modulus
+        :return: a list containing the remainders modulo the least common multiple of the moduli (raises a ValueError if some remainders are inconsistent)
+        """
+        return [self.combine(X) for X in Xs]
@@ -5,26 +5,72 @@ from sage.all import Zmod
 def hensel_lift_linear(f, p, k, roots):
     """
     Uses Hensel lifting to lift the roots of f mod p^k to f mod p^(k + 1)
+    Simple roots (f'(r) != 0 mod p) have exactly one lift, singular roots have either none or p lifts.
     :param f: the polynomial
     :param p: the prime
     :param k: the power
     :param roots: a generator generating the roots of f mod p^k
     :return: a generator generating the roots of f mod p^(k + 1)
     """
+    df = f.derivative()
     pk = p ** k
     pk1 = p ** (k + 1)
     for root in roots:
-        # We're really not using Hensel's lemma correctly here...
-        # Maybe this will be fixed later
-        for i in range(p):
-            new_root = root + i * pk
-            if f(new_root) % pk1 == 0:
-                yield new_root
+        # f(r + i * p^k) = f(r) + i * p^k * f'(r) mod p^(k + 1).
+        fr = int(f(root))
+        dfr = int(df(root)) % p
+        if dfr != 0:
+            i = -(fr // pk) * pow(dfr, -1, p) % p
+            yield root + i * pk
+        elif fr % pk1 == 0:
+            for i in range(p):
+                yield root + i * pk
+
+
+# Taylor shift of the coefficients a of f(r + x) to the coefficients of f(r + 2^i + x), mod 2^k.
+def _taylor_shift_2(a, i, mask):
+    a = list(a)
+    for s in range(len(a) - 1):
+        for j in range(len(a) - 2, s - 1, -1):
+            a[j] = (a[j] + (a[j + 1] << i)) & mask
+
+    return a
+
+
+# Lifts the roots of f mod 2 to f mod 2^k one bit at a time.
+# The Taylor coefficients of f at the current root are updated using shifts, so f is never evaluated.
+def _hensel_roots_2(f, k, roots):
+    x = f.parent().gen()
+    mask = (1 << k) - 1
+    stack = []
+    for root in reversed(list(roots)):
+        a = [int(c) & mask for c in f(x + root).list()]
+        stack.append((root, 1, a + [0] * (2 - len(a))))
+
+    while stack:
+        root, i, a = stack.pop()
+        if i == k:
+            yield root
+            continue
+
+        # f(r + 2^i) = f(r) + 2^i * f'(r) mod 2^(i + 1), so bit i of f(r) only changes if f'(r) is odd.
+        bit = (a[0] >> i) & 1
+        if a[1] & 1:
+            bits = [bit]
+        else:
+            bits = [] if bit else [0, 1]
+
+        for b in reversed(bits):
+            if b == 0:
+                stack.append((root, i + 1, a))
+            else:
+                stack.append((root | (1 << i), i + 1, _taylor_shift_2(a, i, mask)))
 
 
 def hensel_roots(f, p, k):
     """
     Uses Hensel lifting to generate the roots of f mod p^k.
+    If p is 2, the roots are lifted bit by bit without evaluating f.
     :param f: the polynomial
     :param p: the prime
     :param k: the power
@@ -34,11 +80,14 @@ def hensel_roots(f, p, k):
     if f_ == 0:
         roots = range(p)
     elif f_.is_constant():
-        return
+        return iter(())
     else:
         roots = map(int, f_.roots(multiplicities=False))
 
     f = f.change_ring(ZZ)
+    if p == 2:
+        return _hensel_roots_2(f, k, roots)
+
     for i in range(1, k):
         roots = hensel_lift_linear(f, p, i, roots)
 
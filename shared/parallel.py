@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from multiprocessing import Pool
+from multiprocessing import TimeoutError
+
+
+def split_range(start, stop, parts=None):
+    """
+    Splits the range [start, stop) into consecutive subranges of (almost) equal length.
+    :param start: the start of the range (inclusive)
+    :param stop: the end of the range (exclusive)
+    :param parts: the maximum number of subranges (default: the number of CPUs)
+    :return: a list of tuples containing the start (inclusive) and end (exclusive) of each subrange
+    """
+    parts = os.cpu_count() if parts is None else parts
+    length = max(0, stop - start)
+    parts = max(1, min(parts, length))
+    return [(start + length * i // parts, start + length * (i + 1) // parts) for i in range(parts)]
+
+
+def _timed_call(task):
+    f, i, args = task
+    start = time.time()
+    result = f(*args)
+    return i, result, time.time() - start
+
+
+@contextmanager
+def parallel_mapper(workers=None):
+    """
+    Creates a pool of worker processes which is reused for many parallel_map calls, and terminated when the context exits.
+    :param workers: the number of worker processes (default: the number of CPUs, 1 means no worker processes are used)
+    :return: a function taking f and a list of tuples containing the arguments for every call, which returns a list containing the results, in the same order as args
+    """
+    if workers == 1:
+        yield lambda f, args: [f(*a) for a in args]
+        return
+
+    with Pool(workers) as pool:
+        yield pool.starmap
+
+
+def parallel_map(f, args, workers=None):
+    """
+    Calls f for every tuple of arguments, using a pool of worker processes.
+    f must be a module-level function, because it is sent to the worker processes.
+    :param f: the function
+    :param args: a list of tuples containing the arguments for every call
+    :param workers: the number of worker processes (default: the number of CPUs, 1 means no worker processes are used)
+    :return: a list containing the results, in the same order as args
+    """
+    with parallel_mapper(workers) as map_:
+        return map_(f, args)
+
+
+def _call(task):
+    f, args = task
+    return f(*args)
+
+
+def parallel_imap(f, args, workers=None):
+    """
+    Calls f for every tuple of arguments, using a pool of worker processes, and lazily generates the results.
+    The calls are cancelled as soon as the generator is closed.
+    f must be a module-level function, because it is sent to the worker processes.
+    :param f: the function
+    :param args: an iterable of tuples containing the arguments for every call
+    :param workers: the number of worker processes (default: the number of CPUs, 1 means no worker processes are used)
+    :return: a generator generating the results, in the same order as args
+    """
+    if workers == 1:
+        for a in args:
+            yield f(*a)
+
+        return
+
+    with Pool(workers) as pool:
+        yield from pool.imap(_call, ((f, a) for a in args))
+
+
+def parallel_first(f, args, workers=None, timeout=None, progress=False):
+    """
+    Calls f for every tuple of arguments, using a pool of worker processes, until a call returns a result which is not None.
+    The remaining calls are cancelled as soon as a result is found or when the time runs out.
+    f must be a module-level function, because it is sent to the worker processes.
+    :param f: the function
+    :param args: a list or (lazy) iterable of tuples containing the arguments for every call
+    :param workers: the number of worker processes (default: the number of CPUs, 1 means no worker processes are used)
+    :param timeout: the maximum number of seconds to wait for a result (default: no limit)
+    :param progress: whether to log the progress and the estimated remaining time (default: False, only supported if args has a length)
+    :return: a tuple containing the index of the arguments and the first result which is not None, or None if no result was found
+    """
+    start = time.time()
+    total = len(args) if hasattr(args, "__len__") else None
+    tasks = ((f, i, a) for i, a in enumerate(args))
+
+    def handle(done, i, result, elapsed):
+        logging.debug(f"Call {i} finished in {elapsed:.3f} seconds")
+        if progress and total is not None:
+            total_elapsed = time.time() - start
+            eta = total_elapsed / done * (total - done)
+            logging.info(f"Finished {done}/{total} calls ({total_elapsed:.1f} seconds elapsed, ETA {eta:.1f} seconds)")
+        if result is not None:
+            return i, result
+
+    if workers == 1:
+        for done, task in enumerate(tasks, start=1):
+            if timeout is not None and time.time() - start > timeout:
+                logging.info(f"Time limit of {timeout} seconds reached")
+                return None
+
+            found = handle(done, *_timed_call(task))
+            if found is not None:
+                return found
+
+        return None
+
+    with Pool(workers) as pool:
+        # The tasks are consumed lazily by the pool, so args can be very large.
+        results = pool.imap_unordered(_timed_call, tasks)
+        done = 0
+        while True:
+            try:
+                remaining = None if timeout is None else max(0, timeout - (time.time() - start))
+                found = handle(done + 1, *results.next(remaining))
+            except StopIteration:
+                return None
+            except TimeoutError:
+                logging.info(f"Time limit of {timeout} seconds reached")
+                return None
+
+            done += 1
+            if found is not None:
+                # Leaving the with block terminates the remaining calls.
+                return found
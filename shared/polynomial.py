@@ -1,94 +1,161 @@
 import logging
+from functools import lru_cache
 
 from sage.all import ZZ
 from sage.all import Zmod
 
-from shared.crt import fast_crt
+from shared.crt import CRTContext
+from shared.parallel import parallel_map
 
 
-def _polynomial_hgcd(ring, a0, a1):
+# Below this degree, the half GCD is computed using Euclid's algorithm, which avoids the recursion and the 2x2 matrix products of HGCD.
+# The best value depends on the polynomial multiplication of the ring, so it can be tuned using benchmark_hgcd_threshold in test/benchmark_related_message.py.
+_HGCD_THRESHOLD = 64
+
+
+def _polynomial_hgcd_euclid(a0, a1):
+    ring = a0.parent()
+    R00, R01, R10, R11 = ring(1), ring(0), ring(0), ring(1)
+    n = a0.degree()
+    while a1.degree() > n / 2:
+        q, r = a0.quo_rem(a1)
+        R00, R01, R10, R11 = R10, R11, R00 - q * R10, R01 - q * R11
+        a0, a1 = a1, r
+
+    return R00, R01, R10, R11
+
+
+def _polynomial_hgcd(a0, a1):
     assert a1.degree() < a0.degree()
 
     if a1.degree() <= a0.degree() / 2:
         return 1, 0, 0, 1
 
+    if a0.degree() < _HGCD_THRESHOLD:
+        return _polynomial_hgcd_euclid(a0, a1)
+
     m = a0.degree() // 2
-    b0 = ring(a0.list()[m:])
-    b1 = ring(a1.list()[m:])
-    R00, R01, R10, R11 = _polynomial_hgcd(ring, b0, b1)
+    b0 = a0.shift(-m)
+    b1 = a1.shift(-m)
+    R00, R01, R10, R11 = _polynomial_hgcd(b0, b1)
     d = R00 * a0 + R01 * a1
     e = R10 * a0 + R11 * a1
     if e.degree() < m:
         return R00, R01, R10, R11
 
     q, f = d.quo_rem(e)
-    g0 = ring(e.list()[m // 2:])
-    g1 = ring(f.list()[m // 2:])
-    S00, S01, S10, S11 = _polynomial_hgcd(ring, g0, g1)
+    g0 = e.shift(-(m // 2))
+    g1 = f.shift(-(m // 2))
+    S00, S01, S10, S11 = _polynomial_hgcd(g0, g1)
     return S01 * R00 + (S00 - q * S01) * R10, S01 * R01 + (S00 - q * S01) * R11, S11 * R00 + (S10 - q * S11) * R10, S11 * R01 + (S10 - q * S11) * R11
 
 
-def fast_polynomial_gcd(a0, a1):
-    """
-    Uses a divide-and-conquer algorithm (HGCD) to compute the polynomial gcd.
-    More information: Aho A. et al., "The Design and Analysis of Computer Algorithms" (Section 8.9)
-    :param a0: the first polynomial
-    :param a1: the second polynomial
-    :return: the polynomial gcd
-    """
-    # TODO: implement extended variant of half GCD?
+def _fast_polynomial_xgcd(a0, a1, cofactors):
     assert a0.parent() == a1.parent()
 
+    ring = a0.parent()
+    # (a0, a1) = M * (a0, a1) for the original a0 and a1, only tracked if the cofactors are needed.
+    M00, M01, M10, M11 = ring(1), ring(0), ring(0), ring(1)
     if a0.degree() == a1.degree():
         if a1 == 0:
-            return a0
-        a0, a1 = a1, a0 % a1
+            return a0, M00, M01
+        q, r = a0.quo_rem(a1)
+        a0, a1 = a1, r
+        M00, M01, M10, M11 = M10, M11, M00 - q * M10, M01 - q * M11
     elif a0.degree() < a1.degree():
         a0, a1 = a1, a0
+        M00, M01, M10, M11 = M10, M11, M00, M01
 
     assert a0.degree() > a1.degree()
-    ring = a0.parent()
 
     # Optimize recursive tail call.
     while True:
         logging.debug(f"deg(a0) = {a0.degree()}, deg(a1) = {a1.degree()}")
         _, r = a0.quo_rem(a1)
         if r == 0:
-            return a1.monic()
+            return a1, M10, M11
 
-        R00, R01, R10, R11 = _polynomial_hgcd(ring, a0, a1)
+        R00, R01, R10, R11 = _polynomial_hgcd(a0, a1)
         b0 = R00 * a0 + R01 * a1
         b1 = R10 * a0 + R11 * a1
+        if cofactors:
+            M00, M01, M10, M11 = R00 * M00 + R01 * M10, R00 * M01 + R01 * M11, R10 * M00 + R11 * M10, R10 * M01 + R11 * M11
+
         if b1 == 0:
-            return b0.monic()
+            return b0, M00, M01
 
-        _, r = b0.quo_rem(b1)
+        q, r = b0.quo_rem(b1)
         if r == 0:
-            return b1.monic()
+            return b1, M10, M11
 
         a0 = b1
         a1 = r
+        if cofactors:
+            M00, M01, M10, M11 = M10, M11, M00 - q * M10, M01 - q * M11
+
+
+def fast_polynomial_gcd(a0, a1):
+    """
+    Uses a divide-and-conquer algorithm (HGCD) to compute the polynomial gcd.
+    More information: Aho A. et al., "The Design and Analysis of Computer Algorithms" (Section 8.9)
+    :param a0: the first polynomial
+    :param a1: the second polynomial
+    :return: the polynomial gcd
+    """
+    g, _, _ = _fast_polynomial_xgcd(a0, a1, False)
+    return g if g == 0 else g.monic()
+
+
+def fast_polynomial_xgcd(a0, a1):
+    """
+    Uses a divide-and-conquer algorithm (HGCD) to compute the extended polynomial gcd.
+    More information: Aho A. et al., "The Design and Analysis of Computer Algorithms" (Section 8.9)
+    :param a0: the first polynomial
+    :param a1: the second polynomial
+    :return: a tuple containing the (monic) polynomial gcd g, s, and t, such that g = s * a0 + t * a1
+    """
+    g, s, t = _fast_polynomial_xgcd(a0, a1, True)
+    if g == 0:
+        return g, s, t
+
+    lc_inv = g.lc() ** -1
+    return g * lc_inv, s * lc_inv, t * lc_inv
+
+
+def _polynomial_gcd_mod(a, b, p):
+    zmodp = Zmod(p)
+    return fast_polynomial_gcd(a.change_ring(zmodp), b.change_ring(zmodp)).change_ring(ZZ)
+
+
+# The same moduli are often used for many polynomials, so the CRT precomputation is reused.
+@lru_cache(maxsize=16)
+def _crt_context(ps):
+    return CRTContext(ps)
 
 
-def polynomial_gcd_crt(a, b, factors):
+def polynomial_gcd_crt(a, b, factors, workers=1, cache=None):
     """
     Uses the Chinese Remainder Theorem to compute the polynomial gcd modulo a composite number.
+    The gcds modulo the prime factors are independent, so they can be computed by worker processes.
     :param a: the first polynomial
     :param b: the second polynomial
     :param factors: the factors of m (tuples of primes and exponents)
+    :param workers: the number of worker processes (default: 1, None means the number of CPUs)
+    :param cache: a dict to store the gcds modulo the prime factors, which can be reused when the same polynomials are combined with other factors (default: None)
     :return: the polynomial gcd modulo m
     """
     assert a.base_ring() == b.base_ring() == ZZ
 
-    gs = []
-    ps = []
-    for p, _ in factors:
-        zmodp = Zmod(p)
-        gs.append(fast_polynomial_gcd(a.change_ring(zmodp), b.change_ring(zmodp)).change_ring(ZZ))
-        ps.append(p)
+    cache = {} if cache is None else cache
+    ps = tuple(int(p) for p, _ in factors)
+    missing = [p for p in ps if (a, b, p) not in cache]
+    for p, g in zip(missing, parallel_map(_polynomial_gcd_mod, [(a, b, p) for p in missing], workers)):
+        cache[a, b, p] = g
 
-    g, _ = fast_crt(gs, ps)
-    return g
+    # The coefficients of every degree are combined using the same precomputed CRT context, which is also reused across calls with the same factors.
+    gs = [cache[a, b, p].list() for p in ps]
+    n = max(len(g) for g in gs)
+    return a.parent()(_crt_context(ps).combine_many([g[i] if i < len(g) else 0 for g in gs] for i in range(n)))
 
 
 def polynomial_xgcd(a, b):
@@ -0,0 +1,86 @@
+import logging
+import os
+import sys
+import time
+from random import randrange
+
+from sage.all import Zmod
+from sage.all import next_prime
+
+path = os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__))))
+if sys.path[1] != path:
+    sys.path.insert(1, path)
+
+from attacks.rsa import related_message
+from shared import polynomial
+from shared.polynomial import fast_polynomial_gcd
+from shared.polynomial import polynomial_xgcd
+
+
+# Sage's generic gcd is not implemented over Zmod(N) for composite N, so Euclid's algorithm is used over the same ring.
+def _euclid_attack(N, e, c1, c2, difference):
+    x = Zmod(N)["x"].gen()
+    g1 = x ** e - c1
+    g2 = (x + difference) ** e - c2
+    g, _, _ = polynomial_xgcd(g1, g2)
+    return int(-g.monic()[0])
+
+
+def benchmark(bit_length=1024, max_e_bit_length=17, max_euclid_e_bit_length=12):
+    """
+    Compares the running time of the Franklin-Reiter related message attack using the fast gcd with Euclid's algorithm (polynomial_xgcd).
+    :param bit_length: the bit length of the modulus (default: 1024)
+    :param max_e_bit_length: the bit length of the largest public exponent (default: 17)
+    :param max_euclid_e_bit_length: the bit length of the largest public exponent for Euclid's algorithm, which is quadratic (default: 12)
+    """
+    p = next_prime(randrange(2 ** (bit_length // 2 - 1), 2 ** (bit_length // 2)))
+    q = next_prime(randrange(2 ** (bit_length // 2 - 1), 2 ** (bit_length // 2)))
+    N = int(p * q)
+    for e_bit_length in range(2, max_e_bit_length + 1):
+        e = int(next_prime(2 ** (e_bit_length - 1)))
+        m = randrange(N)
+        difference = randrange(2 ** 64)
+        c1 = pow(m, e, N)
+        c2 = pow(m + difference, e, N)
+
+        start = time.time()
+        assert related_message.attack(N, e, c1, c2, lambda x: x, lambda x: x + difference) == m
+        fast_time = time.time() - start
+
+        if e_bit_length > max_euclid_e_bit_length:
+            logging.info(f"{e = }: fast gcd {fast_time:.3f} seconds")
+            continue
+
+        start = time.time()
+        assert _euclid_attack(N, e, c1, c2, difference) == m
+        euclid_time = time.time() - start
+        logging.info(f"{e = }: fast gcd {fast_time:.3f} seconds, Euclid {euclid_time:.3f} seconds")
+
+
+def benchmark_hgcd_threshold(bit_length=1024, degree=4096, thresholds=(8, 16, 32, 64, 128, 256)):
+    """
+    Compares the running time of the fast gcd for different degrees below which the half gcd uses Euclid's algorithm.
+    :param bit_length: the bit length of the modulus (default: 1024)
+    :param degree: the degree of the random polynomials (default: 4096)
+    :param thresholds: the thresholds to try (default: powers of two from 8 to 256)
+    """
+    p = next_prime(randrange(2 ** (bit_length // 2 - 1), 2 ** (bit_length // 2)))
+    q = next_prime(randrange(2 ** (bit_length // 2 - 1), 2 ** (bit_length // 2)))
+    pr = Zmod(p * q)["x"]
+    a = pr.random_element(degree)
+    b = pr.random_element(degree - 1)
+    default_threshold = polynomial._HGCD_THRESHOLD
+    try:
+        for threshold in thresholds:
+            polynomial._HGCD_THRESHOLD = threshold
+            start = time.time()
+            fast_polynomial_gcd(a, b)
+            logging.info(f"{threshold = }: fast gcd {time.time() - start:.3f} seconds")
+    finally:
+        polynomial._HGCD_THRESHOLD = default_threshold
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    benchmark()
+    benchmark_hgcd_threshold()
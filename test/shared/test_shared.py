@@ -3,17 +3,95 @@ import sys
 from unittest import TestCase
 
 from sage.all import GF
+from sage.all import ZZ
+from sage.all import Zmod
 
 path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__)))))
 if sys.path[1] != path:
     sys.path.insert(1, path)
 
+from shared import product_tree
+from shared import remainder_tree
 from shared import rth_roots
+from shared.crt import CRTContext
+from shared.hensel import hensel_roots
+from shared.polynomial import fast_polynomial_gcd
+from shared.polynomial import fast_polynomial_xgcd
+from shared.polynomial import polynomial_gcd_crt
 
 
 class TestShared(TestCase):
+    def test_hensel_roots(self):
+        x = ZZ["x"].gen()
+        for f, p, k in [(x ** 2 - 17, 2, 10), (4 * x ** 2 + 8, 2, 7), ((x - 3) ** 2 * (x - 5), 3, 5), (x ** 2 + 1, 5, 4)]:
+            roots = [r for r in range(p ** k) if f(r) % p ** k == 0]
+            self.assertEqual(sorted(hensel_roots(f, p, k)), roots)
+
+    def test_crt_context(self):
+        M = [1000003, 1000033, 1000037, 1000039, 999983]
+        crt_context = CRTContext(M)
+        self.assertTrue(crt_context.coprime)
+        self.assertEqual(1000003 * 1000033 * 1000037 * 1000039 * 999983, crt_context.modulus)
+        xs = [123456789012345678901234567, 987654321098765432109876543]
+        self.assertEqual(xs, crt_context.combine_many([[x % m for m in M] for x in xs]))
+
+        M = [12, 18, 10, 7]
+        crt_context = CRTContext(M)
+        self.assertFalse(crt_context.coprime)
+        self.assertEqual(1260, crt_context.modulus)
+        self.assertEqual(1001, crt_context.combine([1001 % m for m in M]))
+        self.assertRaises(ValueError, crt_context.combine, [1, 2, 1, 0])
+
+    def test_fast_polynomial_gcd(self):
+        p = 9908484735485245740582755998843475068910570989512225739800304203500256711207262150930812622460031920899674919818007279858208368349928684334780223996774347
+        x = GF(p)["x"].gen()
+        for deg_g, deg_a, deg_b in [(0, 10, 7), (1, 200, 200), (5, 300, 150), (40, 500, 90)]:
+            g = (x ** deg_g + x.parent().random_element(deg_g - 1)) if deg_g > 0 else x.parent()(1)
+            a = g * (x ** deg_a + x.parent().random_element(deg_a - 1))
+            b = g * (x ** deg_b + x.parent().random_element(deg_b - 1))
+            g_ = a.gcd(b)
+            self.assertEqual(g_, fast_polynomial_gcd(a, b))
+            g__, s, t = fast_polynomial_xgcd(a, b)
+            self.assertEqual(g_, g__)
+            self.assertEqual(g__, s * a + t * b)
+
+        N = p * 7267288183214469410349447052665186833632058119533973432573869246434984462336560480880459677870106195135869371300420762693116774837763418518542884912967719
+        x = Zmod(N)["x"].gen()
+        m = 1234567891011121314151617181920
+        e = 257
+        a = x ** e - pow(m, e, N)
+        b = (x + 42) ** e - pow(m + 42, e, N)
+        g, s, t = fast_polynomial_xgcd(a, b)
+        self.assertEqual(x - m, g)
+        self.assertEqual(g, s * a + t * b)
+        self.assertEqual(x - m, fast_polynomial_gcd(a, b))
+
+    def test_polynomial_gcd_crt(self):
+        x = ZZ["x"].gen()
+        factors = [(1000003, 1), (1000033, 1), (1000037, 1)]
+        m = 1000003 * 1000033 * 1000037
+        a = (x - 123456789) * (x ** 3 + 7 * x + 11)
+        b = (x - 123456789) * (x ** 2 + 5)
+        cache = {}
+        g = polynomial_gcd_crt(a, b, factors, cache=cache)
+        self.assertEqual((x - 123456789).change_ring(Zmod(m)), g.change_ring(Zmod(m)))
+        self.assertEqual(3, len(cache))
+        g = polynomial_gcd_crt(a, b, factors, workers=2)
+        self.assertEqual((x - 123456789).change_ring(Zmod(m)), g.change_ring(Zmod(m)))
+
+    def test_remainder_tree(self):
+        X = [3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+        tree = product_tree(X)
+        self.assertEqual(X, tree[0])
+        self.assertEqual([3 * 5 * 7 * 11 * 13 * 17 * 19 * 23 * 29 * 31 * 37], tree[-1])
+        x = 2 ** 100 + 12345
+        self.assertEqual([x % y for y in X], remainder_tree(x, tree))
+
     def test_rth_roots(self):
         q = 9908484735485245740582755998843475068910570989512225739800304203500256711207262150930812622460031920899674919818007279858208368349928684334780223996774347
         c = 7267288183214469410349447052665186833632058119533973432573869246434984462336560480880459677870106195135869371300420762693116774837763418518542884912967719
         e = 21
         self.assertEqual(len(set(rth_roots(GF(q), c, e))), 7)
+        roots = set(rth_roots(GF(q), c, e, cache=True))
+        self.assertEqual(len(roots), 7)
+        self.assertEqual(roots, set(rth_roots(GF(q), c, e, cache=True)))
@@ -1,5 +1,6 @@
 import os
 import sys
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 path = os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__))))
@@ -42,6 +43,35 @@ class TestFactorization(TestCase):
         self.assertIsInstance(p_, int)
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
+        p_, q_ = base_conversion.factorize(N, workers=2, batch_size=4)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+        # Base 11 is not tried.
+        self.assertIsNone(base_conversion.factorize(N, max_base=10))
+
+        # Base 100, square.
+        p = 100 ** 50 + 7
+        N = p ** 2
+        factors = base_conversion.factorize(N)
+        self.assertGreater(len(factors), 1)
+        product = 1
+        for f in factors:
+            self.assertIsInstance(f, int)
+            product *= f
+        self.assertEqual(N, product)
+
+        # Base 10^12 + 39, 31 digits, so it is only found by scanning the bases with less than 32 digits.
+        p = 999999999623999999597758999873644564977253616378241463991983795609375294493626317685360351542893049965812519180886765095793425993665371297925327227752257934602625340621923876351572716172291040
+        q = 1000000000585000000159705000026990145003157846965270943269614611312524688081528013805179592239920447624034434474263732320950808487968337975908654867946108407710600754186137961752600
+        N = p * q
+        factors = base_conversion.factorize(N)
+        self.assertGreater(len(factors), 1)
+        product = 1
+        for f in factors:
+            self.assertIsInstance(f, int)
+            product *= f
+        self.assertEqual(N, product)
 
         # Base 2^160, 2 primes.
         p = 134826985114673693079697889309176855021348273420672992955072560868299506854125722349531357991805652015840085409903545018244092326610812466869635572979608167582448469047292232170026320223391046627827365953771456829800031927295216664570456335020600113109401331922210657078827704893772556600526431969555905511427
@@ -94,6 +124,41 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        # 512 noisy bits, 4 wrong.
+        p_bits = "10100111000101100110010111011001110001010000100111010101101010100010100110111000100001001000100100010011100101001100111000010101100110111010110011110011000100001001010011101101100000111001000111100011011111001001011100010100111111101000011100100111101011110000111101000000000011000110001011111100011011000001100111101000111011101100111010010000001010111100011111011001000111100100010000100010001100011111000110010111110110001011100100111100101100100001010111000000001100111111100111111100000111000110010011000101"
+        # 512 noisy bits, 2 wrong.
+        q_bits = "10000000000010001101011100000010110001101010100010010011011100010110010110100110010110110101000011100001001111100001010000101010101101001011101011000000100111010010110111100111101010110000000001010010101101010001101110000011001100000000110111011001011001010101101110100001111100101111111100011101101100011100110100110001000100011110011010001110000011000111011000011010011010100111111000101110001110001110000101110011100001101010000101011011110101010101100011011110110010101001111101001101100110101111001010101101"
+        p_, q_ = branch_and_prune.factorize_pq_noisy(N, PartialInteger.from_bits_be(p_bits), PartialInteger.from_bits_be(q_bits))
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+
+        # 512 noisy bits, 18 wrong.
+        p_bits = "10100111000101100110010111011001110000010000100111010100101010100010100110111000100001001000100100010011100101000100001000010101100110111010110011110010000100101001010011101101100000111001000111100011011111001001011100010100111111101000011100100111101001010000111101000000000011010110001011101100011111000001100111001000111011101101111010010000001010111100011110011001100111100100010000100010000100011111000110000111110110001011100100111100101100100001010111000000001100111101100111111100001111001110010010000101"
+        # 512 noisy bits, 14 wrong.
+        q_bits = "11000000000010001101011100000000110001101010100010010011011100010110010110100110010110110101000011100001000111100001110000101010101101001011101011000000100111010010010111100111101010110000000001010000101101010001101110000011001101000000110101011001011001110101100110100001111100101111101100011101101101011100110100110001000100001110011010001110000011000111011000011010111010100111111000101110001110001110000101110011100001101010000101011011110101011101100011011110110010101011111101001101100110101111001010101101"
+        # 1024 noisy bits, 28 wrong.
+        d_bits = "0000101000101100100011010011001111011001011101101000010100100011010011011110101101011011111110010110100010111001111110100110100100100010011110101101011101101001001011010001100110011100000110100001110101111011000011000100000010010111001001101111111111001100111011001110000111000111010011001101111000101111101111011011110101110100001011010100111111001010111110101100010100100001011001010100111100011100000010100001101110101110100010111011001101100001100101000001111010110100011100001011010111111011000011101010101010101110010110100110110111011010010101000010111010000111110111010001101001001100000101110110010011010111000100000111001010111001011101010100000011101000100000011000010010111100100111111001111110010001001100000110110101111000011100110100000110000101101010110000101101010011111100000110001001011011111001000011111100110111111001110000010011000011001111011101001010011010000110001101101111110100010111100110100000010101000011010100101011100011110101000101011110110111100100000100010111100101100110011001011010010001"
+        p_, q_ = branch_and_prune.factorize_pqd_noisy(N, e, PartialInteger.from_bits_be(p_bits), PartialInteger.from_bits_be(q_bits), PartialInteger.from_bits_be(d_bits), workers=2)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+
+        # 512 noisy bits, 34 wrong.
+        p_bits = "10100111000101100010010111011001110001010000100111010101100010000010101110111000100011001000100100000011100101001100111000011100100110110010110011110011000100001001011011101101100000111111000111100011011111001001010100010100111111101000011100100101101011110000111101000000000011000110001011111100011011000011100111101000111011001101111010010000001010111100011101011001010111101100010000000010001100011111000110000111110110011011100000111111101100100001010111000000001100111111101011111100000011000010010011000101"
+        # 512 noisy bits, 30 wrong.
+        q_bits = "10000000000010001101011110000010100001101010101110010011001100010110010101100110010110110101000010110001001111101100010010101010101111101101101011000000100111010010110111100111101010111000000001010010101101010001101100000011001100000000110111011001011001010101101110100001111100101111111100011101101100011100110100110001000100011010011010001110000011000011001000011010011010100111111000101110000110001110000101100011100001101010000101011011110101011101100011011110110010101001110001001111100110101111001010101101"
+        # 1024 noisy bits, 56 wrong.
+        d_bits = "0000100000101000100011010011101111011001011101101000010100000001010110011110101101011011111110000110100010111001110110100110100101100011001110101101011101101001101011010001100110011110000110100001110101111011000010000100001010010111000001101111111111001100111111001110000111000110010011001101111000101111101111111011100101110011001011111100111111101010101110100001010010000101011001010101011100011000000010100001111111101110100011111011001101100011101101000001101010110100010100001011010110111011000011101010101010101110010110100110110111011010010101000010111010000111000111010001101001001101000101110110011011010111000100010111001110111001011101010100010011101100100000011001000010011111100111110001111110000001001100000010110101111000011100110100001110000011101010110000001101010011110100000110001001011011111101000111101100110111111001110000110011000011001111111101001010011010000110001101101111111000010101100110101000010111001011110100101011100011110001010101011110110111110100000100010111100101100110011001011010010001"
+        # 512 noisy bits, 18 wrong.
+        dp_bits = "11001011111001011001000001001011011000101000101110110101011011100010010100101100001111111100011001101100110000110100100111110111010101010001001100010001001001100100000001011001011101110110011011111011001111110001001010001100100111010101110011111000011010101001110000011010011111110011101011111000101010111010011101100010001000011111100111001011011101011011101011111011110011111011100001100000000111101111001011000100000100000101011101011010001111111110100011001101100101011000111101110101101010100101010101010001"
+        # 512 noisy bits, 30 wrong.
+        dq_bits = "01011101010001011001001111010101000101110110010101100101010111111001101110111100101100000010001101100010101010100111011111001111100100001010111111010111111001111111100111101000000111101011111111110010100000001010101101010101010010111010100110001011001010001110001100111110010000001010011010000111011111000100001011001010001001111000101100110101000010010101001011110011000101111010011100001010101001110011011101011110100100001100001001110110100000110001101101100101110111100100111100011000110110000101111101010101"
+        p_, q_ = branch_and_prune.factorize_pqddpdq_noisy(N, e, PartialInteger.from_bits_be(p_bits), PartialInteger.from_bits_be(q_bits), PartialInteger.from_bits_be(d_bits), PartialInteger.from_bits_be(dp_bits), PartialInteger.from_bits_be(dq_bits))
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+
     def test_complex_multiplication(self):
         # Recursion limit is necessary for calculating division polynomials using sage.
         rec_limit = sys.getrecursionlimit()
@@ -108,6 +173,13 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        with TemporaryDirectory() as cache_dir:
+            p_, q_ = complex_multiplication.factorize_sweep(N, [400, 403, D], workers=2, cache_dir=cache_dir)
+            self.assertIsInstance(p_, int)
+            self.assertIsInstance(q_, int)
+            self.assertEqual(N, p_ * q_)
+            self.assertTrue(os.listdir(os.path.join(cache_dir, "hilbert_class_polynomials")))
+
         sys.setrecursionlimit(rec_limit)
 
     def test_coppersmith(self):
@@ -120,6 +192,12 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        p_, q_, m, t = coppersmith.factorize_p_sweep(N, PartialInteger.msb_of(p, 512, 280), timeout=60)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+        self.assertGreater(m, 0)
+
         p_, q_ = coppersmith.factorize_p(N, PartialInteger.lsb_of(p, 512, 280), m=6, t=6)
         self.assertIsInstance(p_, int)
         self.assertIsInstance(q_, int)
@@ -136,6 +214,12 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        p_, q_, m, t = coppersmith.factorize_p_sweep(N, PartialInteger.from_hex_be(p_hex), max_m=4, timeout=60)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+        self.assertGreater(t, 0)
+
         p_hex = "9e5cce87????720e5a53f32044328cffaef96e72cf6b8cdcc983748bdb6abc64????6d17c578326bc80d634a03c57b3e25775f6b54e9be37a70f????ab6e16f1"
         p_, q_ = coppersmith.factorize_p(N, PartialInteger.from_hex_be(p_hex), m=4, t=1)
         self.assertIsInstance(p_, int)
@@ -152,6 +236,25 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        # Three unknown components, using the Jochemsz-May method.
+        partial_p = PartialInteger.msb_of(p, 512, 492)
+        partial_q = PartialInteger.middle_of(q, 512, 20, 20)
+        m, strategy, dimension, margin = coppersmith.estimate_pq(N, partial_p, partial_q)
+        self.assertGreater(margin, 0)
+        self.assertGreater(dimension, 0)
+        p_, q_ = coppersmith.factorize_pq(N, partial_p, partial_q)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+        p_, q_ = coppersmith.factorize_pq(N, partial_p, partial_q, m=m, strategy=strategy)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+
+        # Too many unknown bits for the asymptotic condition.
+        self.assertIsNone(coppersmith.estimate_pq(N, PartialInteger.msb_of(p, 512, 100), PartialInteger.middle_of(q, 512, 200, 200)))
+        self.assertIsNone(coppersmith.factorize_pq(N, PartialInteger.msb_of(p, 512, 100), PartialInteger.middle_of(q, 512, 200, 200)))
+
     def test_fermat(self):
         p = 383885088537555147258860631363598239852683844948508219667734507794290658581818891369581578137796842442514517285109997827646844102293746572763236141308659
         q = 383885088537555147258860631363598239852683844948508219667734507794290658581818891369581578137796842442514517285109997827646844102293746572763236141308451
@@ -180,6 +283,11 @@ class TestFactorization(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(N, p_ * q_)
 
+        p_, q_ = gaa.factorize(N, rp, rq, workers=2)
+        self.assertEqual(N, p_ * q_)
+
+        self.assertIsNone(gaa.factorize(N + 2, rp, rq, max_iterations=1000))
+
     def test_known_phi(self):
         # These primes aren't special.
         p = 11106026672819778415395265319351312104517763207376765038636473714941732117831488482730793398782365364840624898218935983446211558033147834146885518313145941
@@ -223,6 +331,39 @@ class TestFactorization(TestCase):
             self.assertIsInstance(q, int)
             self.assertEqual(N[i], p * q)
 
+        for i, (p, q) in enumerate(implicit.factorize_msb_batch(N, p_bit_length + q_bit_length, t)):
+            self.assertIsInstance(p, int)
+            self.assertIsInstance(q, int)
+            self.assertEqual(N[i], p * q)
+
+        # More moduli than the group size, so several overlapping groups are reduced.
+        # The p values share their 724 most significant bits, so groups of two moduli are sufficient.
+        p_bit_length = 1024
+        q_bit_length = 64
+        t = 724
+        p1 = 138083647210306755132991134464289479248551622812890420908047072384652515867736840166750649477716995626503648635138082149637508957977039623758701823571891345595667063021737114401720178424706556547623895628925732385006297341791782013293497400036378376819789483480936383884687665486531523986456626852689770965521
+        q1 = 16042536068955115637
+        p2 = 138083647210306755132991134464289479248551622812890420908047072384652515867736840166750649477716995626503648635138082149637508957977039623758701823571891345595667063021737114401720178424706556547623895628925732385006299085848352167981069187673301289615966537903645965299232567827604897050799095281346083562459
+        q2 = 18111923897596466081
+        p3 = 138083647210306755132991134464289479248551622812890420908047072384652515867736840166750649477716995626503648635138082149637508957977039623758701823571891345595667063021737114401720178424706556547623895628925732385006297214222596075310385415092528474252434692230345391579158058349687376088183965934956019197051
+        q3 = 10713803601939350183
+        p4 = 138083647210306755132991134464289479248551622812890420908047072384652515867736840166750649477716995626503648635138082149637508957977039623758701823571891345595667063021737114401720178424706556547623895628925732385006298249898787184389591946475162353117306438406534777769683858304010074239153868036266811260137
+        q4 = 15430286704177707847
+        p5 = 138083647210306755132991134464289479248551622812890420908047072384652515867736840166750649477716995626503648635138082149637508957977039623758701823571891345595667063021737114401720178424706556547623895628925732385006298943125542242400837997550028414767001497416817860393601894542770725260216727509043393823949
+        q5 = 16275798665812214377
+        N = [p1 * q1, p2 * q2, p3 * q3, p4 * q4, p5 * q5]
+        factors = implicit.factorize_msb_batch(N, p_bit_length + q_bit_length, t, group_size=2)
+        self.assertEqual([(p1, q1), (p2, q2), (p3, q3), (p4, q4), (p5, q5)], factors)
+        factors = implicit.factorize_msb_batch(N, p_bit_length + q_bit_length, t, group_size=2, workers=2)
+        self.assertEqual([(p1, q1), (p2, q2), (p3, q3), (p4, q4), (p5, q5)], factors)
+
+        # An unrelated modulus makes every group containing it fail, so those groups are reduced again without it.
+        p6 = 149441862871523210734453078924276909554740426967396514179311106664380340110698776185761844329971839261126933084209752979093507814936312858513558773575755075642988592324026645390312161041156977867114397068610788426105631679504666888676340650732179162551907901817761496128814731019046645853612150051172170969987
+        q6 = 12988278963609000829
+        N = [p1 * q1, p2 * q2, p6 * q6, p3 * q3, p4 * q4, p5 * q5]
+        factors = implicit.factorize_msb_batch(N, p_bit_length + q_bit_length, t, group_size=3)
+        self.assertEqual([(p1, q1), (p2, q2), None, (p3, q3), (p4, q4), (p5, q5)], factors)
+
         p_bit_length = 1024
         q_bit_length = 512
         t = 684
@@ -247,10 +388,25 @@ class TestFactorization(TestCase):
         p = 85179386137518452231354185509698113331528483782580002217930594759662020757433
         q = 121807704694511224555991770528701515984374557330058194205583818929517699002107
         N = p * q
-        p_, q_ = roca.factorize(N, M, 5, 6)
-        self.assertIsInstance(p_, int)
-        self.assertIsInstance(q_, int)
-        self.assertEqual(N, p_ * q_)
+        with TemporaryDirectory() as cache_dir:
+            p_, q_ = roca.factorize(N, M, 5, 6, cache_dir=cache_dir)
+            self.assertIsInstance(p_, int)
+            self.assertIsInstance(q_, int)
+            self.assertEqual(N, p_ * q_)
+            self.assertEqual(1, len(os.listdir(os.path.join(cache_dir, "roca"))))
+
+            self.assertTrue(roca.fingerprint(N))
+            self.assertFalse(roca.fingerprint(N + 2))
+            # M' generated by factorize is reused.
+            vulnerable = list(roca.scan([N + 2, N], cache_dir=cache_dir))
+            self.assertEqual(1, len(os.listdir(os.path.join(cache_dir, "roca"))))
+
+        self.assertEqual(1, len(vulnerable))
+        N_, M_, m, t = vulnerable[0]
+        self.assertEqual(N, N_)
+        self.assertEqual(0, M % M_)
+        self.assertEqual((5, 6), (m, t))
+        self.assertEqual(M_, roca.get_M_(N.bit_length(), M, cache_dir=None))
 
     def test_shor(self):
         # Examples from the reference paper.
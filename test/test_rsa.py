@@ -9,6 +9,7 @@ from unittest import TestCase
 from Crypto.Cipher import PKCS1_v1_5
 from Crypto.PublicKey import RSA
 from sage.all import crt
+from sage.all import factor
 
 path = os.path.dirname(os.path.dirname(os.path.realpath(os.path.abspath(__file__))))
 if sys.path[1] != path:
@@ -211,6 +212,34 @@ class TestRSA(TestCase):
         self.assertIsInstance(s, int)
         self.assertEqual(sign_oracle(m), s)
 
+        # Sparse echelon form against a dense random system modulo a small prime.
+        e = 101
+        relations = [{j: randrange(e) for j in range(6) if randrange(3) > 0} for _ in range(10)]
+        pivots = []
+        inserted = []
+        for v in relations:
+            if desmedt_odlyzko._insert(pivots, e, v, len(inserted)):
+                inserted.append(v)
+        self.assertEqual(len(pivots), len(inserted))
+        # A combination of the inserted relations doesn't increase the rank.
+        self.assertFalse(desmedt_odlyzko._insert(pivots, e, {j: sum(v.get(j, 0) for v in inserted) for j in range(6)}, len(inserted)))
+        coefficients = [randrange(e) for _ in inserted]
+        target = {j: sum(c * v.get(j, 0) for c, v in zip(coefficients, inserted)) % e for j in range(6)}
+        b = desmedt_odlyzko._solve(pivots, e, target)
+        for j in range(6):
+            self.assertEqual(target[j], sum(bi * inserted[i].get(j, 0) for i, bi in b.items()) % e)
+
+        # The hash oracle is the identity, so the smooth relations are the 7-smooth integers, with batches of different sizes.
+        P = 2 * 3 * 5 * 7
+        smooth = [m for m in range(1, 200) if all(p <= 7 for p, _ in factor(m))]
+        for workers in [1, 2]:
+            relations = []
+            for m, factors in desmedt_odlyzko._smooth_relations(abs, P, workers, 7, lambda: 10 - len(relations) % 10):
+                relations.append((m, list(factors)))
+                if len(relations) == len(smooth):
+                    break
+            self.assertEqual([(m, list(factor(m))) for m in smooth], relations)
+
     def test_extended_wiener_attack(self):
         p = 8962183829526343305205665485515731618546029297439020752534914809943234334520404067067844789415616008948709769282722944473756884384422045609586429488722819
         q = 11411892842209276999318813933411657011974573219176710970747439412565013759888750685922800578656539187278906477356731952452991129515326613660882430066260819
@@ -224,6 +253,12 @@ class TestRSA(TestCase):
         self.assertIsInstance(d_, int)
         self.assertEqual(n, p_ * q_)
         self.assertEqual(d, d_)
+        p_, q_, d_ = extended_wiener_attack.attack(n, e, workers=2)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertIsInstance(d_, int)
+        self.assertEqual(n, p_ * q_)
+        self.assertEqual(d, d_)
 
     def test_hastad_attack(self):
         p1 = 12238840029255924128261773522963221621618780074771826797770294317526342852350770883811112904932108204101484192491928770368834167240882579171193850986455837
@@ -281,6 +316,11 @@ class TestRSA(TestCase):
         self.assertIsInstance(q_, int)
         self.assertEqual(q, q_)
 
+        p_, q_ = next(known_crt_exponents.attack(e - 2 ** 10, e + 2 ** 10, N=N, dp=dp, workers=2, batch_size=256))
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+
         p_, q_ = known_crt_exponents.attack_partial(N, e, PartialInteger.msb_of(dp, 512, 256), PartialInteger.msb_of(dq, 512, 256), m=12, t=12)
         self.assertIsInstance(p_, int)
         self.assertIsInstance(q_, int)
@@ -383,6 +423,10 @@ class TestRSA(TestCase):
             else:
                 self.fail()
 
+            # Known most significant bits of the plaintext.
+            m_ = list(non_coprime_exponent.attack(N, e, phi, c, predicate=lambda m_: m_ >> 64 == m >> 64))
+            self.assertIn(m, m_)
+
     def test_partial_key_exposure(self):
         p = 10910578377493709111333790184427664202765704106579350486788097192764075505932456611273616722978391482349202742319580571195628069062856385333010738300159289
         q = 9543709188272129636130984528523762431366215631912419189389727421314687517826682117237804919302025420051881375430279526592105566649224606602944612854468009
@@ -433,6 +477,12 @@ class TestRSA(TestCase):
         self.assertEqual(N, p_ * q_)
         self.assertIsInstance(d_, int)
         self.assertEqual(d, d_)
+        p_, q_, d_ = partial_key_exposure.attack(N, e, PartialInteger.lsb_of(d, 1024, 300), m=4, t=4, workers=2)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertEqual(N, p_ * q_)
+        self.assertIsInstance(d_, int)
+        self.assertEqual(d, d_)
 
         e = 1342190465933073539882079424718736636251811109323478531285823066337637602613426487933457123523547784034204609585360266973
         d = pow(e, -1, phi)
@@ -564,6 +614,10 @@ class TestRSA(TestCase):
         else:
             self.fail()
 
+        m_ = next(related_message.attack_xor(N, e, c1, c2, x, workers=2))
+        self.assertIsInstance(m_, int)
+        self.assertEqual(m, m_)
+
     def test_stereotyped_message(self):
         p = 9427799621011951541928982832607077548740094159448220696315390638465327417349606285858243970722509063632354007970943596939810149951744601156359969671857449
         q = 11870402454659943941264241250285724555674252791764405289506083966512661811544805338494879563927626484667192683911307016139516417804102333067626665881499791
@@ -596,6 +650,16 @@ class TestRSA(TestCase):
         self.assertEqual(N, p_ * q_)
         self.assertEqual(d, d_)
 
+        results = list(wiener_attack.attack_many([(N, 65537), (N, e), (N, 3)], workers=2, batch_size=2))
+        self.assertEqual(1, len(results))
+        i, p_, q_, d_ = results[0]
+        self.assertEqual(1, i)
+        self.assertIsInstance(p_, int)
+        self.assertIsInstance(q_, int)
+        self.assertIsInstance(d_, int)
+        self.assertEqual(N, p_ * q_)
+        self.assertEqual(d, d_)
+
     def test_wiener_attack_common_prime(self):
         p = 6782064950424760710980284774219634491993236863153483768598482045213175969155112496910085683689731379194662789263026739644356045047675956598858137448376083
         q = 8504790992500016807878718231498496399986587899005250624106963488787126208070626038486629561793688885242005440622123291666782461185365857422920183086563257